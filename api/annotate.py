@@ -0,0 +1,154 @@
+"""
+annotate.py
+
+Batched highlight writer shared by the highlighters.
+
+Calling `annot.update()` per rectangle regenerates one appearance stream
+per highlight, and PyMuPDF adds fixed Python-side work to every call, so
+dense CounselLink pages spent most of their time there. The writer instead
+collects the planned marks per page and colour, merges rectangles that
+overlap or touch on the same row, creates the annotations for a page in one pass and lets
+MuPDF regenerate all of that page's appearance streams at once.
+
+Annotation modes (HIGHLIGHT_ANNOT_MODE or annot_mode=):
+  • "rect"   – default; one Highlight annotation per rectangle, as before.
+  • "keeper" – one multi-quad Highlight per colour (i.e. per keeper) per
+               page. Far fewer annotation objects and a smaller file, but
+               a keeper's highlights on a page are selected/deleted together.
+"""
+import os
+from collections import defaultdict
+
+ANNOT_MODES = ("rect", "keeper")
+DEFAULT_ANNOT_MODE = os.environ.get("HIGHLIGHT_ANNOT_MODE", "rect")
+MERGE_GAP = 0.5     # pt; same-colour rects on one row closer than this become one
+ROW_OVERLAP = 0.5   # rects sharing less of their height than this are on different rows
+MIN_SIZE = 0.5      # pt; narrower/shorter rects are dropped after clipping
+
+Rect = tuple[float, float, float, float]
+Colour = tuple[float, float, float]
+
+
+def merge_rects(rects: list[Rect], gap: float = MERGE_GAP) -> list[Rect]:
+    """
+    Merge same-row rects that overlap or touch.
+
+    Rects stacked row on row are left alone, even where they overlap (word
+    boxes are often taller than the line pitch): a highlight's rounded ends
+    grow with its height, so one tall highlight would spill past the row ends.
+    Two rects are on one row when their tops and bottoms agree within `gap`,
+    or when they share at least ROW_OVERLAP of the shorter one's height.
+    """
+    merged: list[list[float]] = []
+    for x0, y0, x1, y1 in sorted(rects, key=lambda r: (r[1], r[0])):
+        target = None
+        for m in reversed(merged):
+            if m[3] < y0 - gap:
+                continue  # ends above this rect
+            shared = min(y1, m[3]) - max(y0, m[1])
+            same_row = ((abs(y0 - m[1]) <= gap and abs(y1 - m[3]) <= gap)
+                        or shared >= ROW_OVERLAP * min(y1 - y0, m[3] - m[1]))
+            if same_row and x0 <= m[2] + gap and m[0] <= x1 + gap:
+                target = m
+                break
+        if target is None:
+            merged.append([x0, y0, x1, y1])
+        else:
+            target[:] = min(target[0], x0), min(target[1], y0), max(target[2], x1), max(target[3], y1)
+    return [tuple(m) for m in merged]
+
+
+def _refresh_appearances(page, annots):
+    """Regenerate the appearance streams of every changed annotation on `page`."""
+    import fitz
+
+    try:
+        # set_colors writes /C without flagging the annotation as changed
+        for annot in annots:
+            fitz.mupdf.pdf_dirty_annot(annot.this)
+        fitz.mupdf.pdf_update_page(page._pdf_page())
+    except AttributeError:
+        # PyMuPDF builds without the low-level bindings: one update per annotation
+        for annot in annots:
+            annot.update()
+
+
+class AnnotationWriter:
+    """
+    Buffers (page, rect, colour) marks and writes them a page at a time.
+
+    `add` marks in any order; `flush(before=p)` writes every buffered page
+    below index p (all pages when `before` is None). `count` is the number
+    of annotations written so far, also reported to `progress("annotations",
+    count)` after each page.
+    """
+
+    def __init__(self, doc, opacity: float | None = None, mode: str | None = None,
+                 progress=None):
+        self.mode = mode or DEFAULT_ANNOT_MODE
+        if self.mode not in ANNOT_MODES:
+            raise ValueError(f"Unknown annotation mode: {self.mode!r} (choose from {', '.join(ANNOT_MODES)})")
+        self.doc = doc
+        self.opacity = opacity
+        self.progress = progress or (lambda key, count: None)
+        self.count = 0
+        # page → colour → rects, in the order the colours first appear
+        self._pages: dict[int, dict[Colour, list[Rect]]] = defaultdict(lambda: defaultdict(list))
+
+    def add(self, marks):
+        for pno, rect, colour in marks:
+            self._pages[pno][tuple(colour)].append(tuple(rect))
+
+    def flush(self, before: int | None = None) -> int:
+        for pno in sorted(p for p in self._pages if before is None or p < before):
+            self._write_page(self.doc[pno], self._pages.pop(pno))
+            self.progress("annotations", self.count)
+        return self.count
+
+    def _style(self, annot, colour):
+        annot.set_colors(stroke=colour)
+        if self.opacity is not None:
+            annot.set_opacity(self.opacity)
+
+    def _write_page(self, page, by_colour):
+        import fitz  # deferred so the API can import the modes without PyMuPDF
+
+        bounds = page.rect
+        annots = []
+        for colour, rects in by_colour.items():
+            clipped = []
+            for x0, y0, x1, y1 in merge_rects(rects):
+                x0, y0 = max(0, x0), max(0, y0)
+                x1, y1 = min(bounds.x1, x1), min(bounds.y1, y1)
+                if x1 - x0 >= MIN_SIZE and y1 - y0 >= MIN_SIZE:
+                    clipped.append(fitz.Rect(x0, y0, x1, y1))
+            if not clipped:
+                continue
+            if self.mode == "keeper":
+                annot = page.add_highlight_annot(quads=[r.quad for r in clipped])
+                if annot is not None:
+                    self._style(annot, colour)
+                    annots.append(annot)
+                    self.count += 1
+                    continue
+            for rect in clipped:
+                annot = page.add_highlight_annot(rect)
+                if annot is None:
+                    # some malformed pages refuse text markers; a plain rect always works
+                    annot = page.add_rect_annot(rect)
+                    self._style(annot, colour)
+                    annot.update()
+                else:
+                    self._style(annot, colour)
+                    annots.append(annot)
+                self.count += 1
+        if annots:
+            _refresh_appearances(page, annots)
+
+
+def write_marks(doc, marks, opacity: float | None = None, mode: str | None = None,
+                progress=None) -> int:
+    """Write all `marks` to `doc` in one batched pass; returns the number of annotations."""
+    writer = AnnotationWriter(doc, opacity, mode, progress)
+    writer.add(marks)
+    return writer.flush()
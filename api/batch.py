@@ -0,0 +1,201 @@
+"""
+batch.py
+
+Highlight many invoices in one request.
+
+Uploads (loose PDFs and/or ZIPs of PDFs) are expanded into (name, bytes)
+pairs, highlighted concurrently on a bounded process pool, and written into
+a ZIP that is streamed back one member at a time as each invoice finishes.
+A `manifest.json` member, written last, records the status of every file,
+so one malformed PDF does not fail the whole batch.
+
+Configuration (environment):
+    HIGHLIGHT_BATCH_WORKERS  – concurrent invoices (default: CPU count)
+    HIGHLIGHT_BATCH_MAX      – maximum PDFs per batch (default 1000)
+    HIGHLIGHT_BATCH_FILE_MB  – maximum size of one PDF, unpacked, in MB (default 256)
+    HIGHLIGHT_BATCH_MAX_MB   – maximum size of a whole batch, unpacked, in MB (default 2048)
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import zipfile
+from pathlib import PurePath
+
+import instrument
+from detect import detect_platform
+from platforms import get_highlighter
+from pools import ProcessPool
+
+log = logging.getLogger(__name__)
+
+BATCH_WORKERS = int(os.environ.get("HIGHLIGHT_BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_MAX = int(os.environ.get("HIGHLIGHT_BATCH_MAX", "1000"))
+BATCH_FILE_BYTES = int(os.environ.get("HIGHLIGHT_BATCH_FILE_MB", "256")) * 1024 * 1024
+BATCH_MAX_BYTES = int(os.environ.get("HIGHLIGHT_BATCH_MAX_MB", "2048")) * 1024 * 1024
+AUTO = "auto"
+
+# ─────────────── Input expansion ──────────────────────────────
+def is_zip(name: str, data: bytes) -> bool:
+    return name.lower().endswith(".zip") or data[:4] == b"PK\x03\x04"
+
+def expand_uploads(uploads):
+    """
+    Flatten [(filename, bytes)] into PDF entries, unpacking ZIP archives.
+
+    Returns (entries, skipped) where skipped lists archive members that are
+    not PDFs. Raises ValueError when the batch exceeds HIGHLIGHT_BATCH_MAX
+    PDFs, or a PDF or the whole batch its byte cap once unpacked.
+    """
+    entries, skipped = [], []
+    total = 0
+
+    def add(name, data):
+        nonlocal total
+        total += len(data)
+        if total > BATCH_MAX_BYTES:
+            raise ValueError(f"Batch is larger than {BATCH_MAX_BYTES // (1024 * 1024)} MB unpacked")
+        entries.append((name, data))
+
+    for name, data in uploads:
+        if not is_zip(name, data):
+            add(PurePath(name).name, data)
+            continue
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                member = PurePath(info.filename)
+                if info.is_dir() or member.parts[0] == "__MACOSX" or member.name.startswith("."):
+                    continue
+                if member.suffix.lower() != ".pdf":
+                    skipped.append(info.filename)
+                    continue
+                add(member.name, _read_member(zf, info))
+        if len(entries) > BATCH_MAX:
+            break
+    if len(entries) > BATCH_MAX:
+        raise ValueError(f"Batch has more than {BATCH_MAX} PDFs")
+    return entries, skipped
+
+def _read_member(zf, info) -> bytes:
+    """A ZIP member's bytes, refused past HIGHLIGHT_BATCH_FILE_MB (a zip bomb)."""
+    # the declared size can lie, so the read itself is bounded too
+    if info.file_size > BATCH_FILE_BYTES:
+        raise ValueError(f"{info.filename} is larger than {BATCH_FILE_BYTES // (1024 * 1024)} MB unpacked")
+    with zf.open(info) as f:
+        data = f.read(BATCH_FILE_BYTES + 1)
+    if len(data) > BATCH_FILE_BYTES:
+        raise ValueError(f"{info.filename} is larger than {BATCH_FILE_BYTES // (1024 * 1024)} MB unpacked")
+    return data
+
+def unique_names(names):
+    """Disambiguate duplicate output names: a.pdf, a (2).pdf, …, never reusing any name."""
+    taken, emitted, out = set(names), set(), []
+    for name in names:
+        if name in emitted:
+            p, n = PurePath(name), 2
+            while f"{p.stem} ({n}){p.suffix}" in taken:
+                n += 1
+            name = f"{p.stem} ({n}){p.suffix}"
+            taken.add(name)
+        emitted.add(name)
+        out.append(name)
+    return out
+
+# ─────────────── Worker side ──────────────────────────────────
+def highlight_one(name, data, platform, save_mode, progress=None, annot_mode=None, pages=None):
+    """Worker: highlight one invoice; returns (platform, pdf bytes, timings).
+
+    `timings` is `Instrument.as_dict()`: per-stage ms, total ms and counters.
+    With `pages` (e.g. "120-180") only that page range is highlighted and returned.
+    """
+    inst = instrument.Instrument()
+
+    def report(key, count):
+        inst(key, count)
+        if progress:
+            progress(key, count)
+
+    def run(platform):
+        if platform == AUTO:
+            with instrument.stage("detect"):
+                platform = detect_platform(data)
+            if platform is None:
+                raise ValueError("Could not detect the billing platform")
+        highlighter, _version = get_highlighter(platform)
+        out = io.BytesIO()
+        highlighter(data, out, title=name, save_mode=save_mode, progress=report, annot_mode=annot_mode,
+                    pages=pages)
+        return platform, out.getvalue()
+
+    platform, pdf = inst.run(run, platform)
+    return platform, pdf, inst.as_dict()
+
+pool = ProcessPool("batch", BATCH_WORKERS)
+
+def shutdown_pool():
+    pool.shutdown()
+
+# ─────────────── Streaming ZIP ────────────────────────────────
+class _ChunkSink:
+    """Write-only, non-seekable file object; zipfile falls back to data descriptors."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+async def stream_batch_zip(entries, platforms, save_mode, skipped=()):
+    """
+    Async generator of ZIP bytes: submits every entry to the pool and appends
+    each highlighted PDF to the archive as soon as it is ready.
+
+    `platforms[i]` is the platform for `entries[i]` ("auto" to detect).
+    """
+    loop = asyncio.get_running_loop()
+    names = unique_names([name for name, _ in entries])
+    pending = {}
+    for name, (orig, data), platform in zip(names, entries, platforms):
+        fut = asyncio.wrap_future(pool.submit(highlight_one, orig, data, platform, save_mode), loop=loop)
+        pending[fut] = (name, orig, platform)
+
+    manifest = [{"file": name, "status": "skipped", "error": "Not a PDF"} for name in skipped]
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    name, orig, platform = pending.pop(fut)
+                    entry = {"file": orig, "output": name, "platform": platform}
+                    try:
+                        entry["platform"], pdf, timings = fut.result()
+                    except Exception as e:
+                        log.warning(f"Batch item {orig} failed: {e}")
+                        entry.update(status="error", error=str(e) or type(e).__name__)
+                        del entry["output"]
+                    else:
+                        zf.writestr(name, pdf)
+                        entry.update(status="ok", bytes=len(pdf),
+                                     seconds=round(timings["total_ms"] / 1000, 3), timings=timings)
+                    manifest.append(entry)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            for fut in pending:
+                fut.cancel()  # client went away: drop work that has not started
+
+        ok = sum(1 for m in manifest if m["status"] == "ok")
+        log.info(f"Batch finished: {ok}/{len(entries)} highlighted")
+        zf.writestr("manifest.json", json.dumps({"files": manifest}, indent=2))
+    yield sink.drain()
@@ -0,0 +1,201 @@
+"""
+cache.py
+
+Content-addressed result cache for the /python-api/highlight endpoint.
+
+Three levels, all on local disk and LRU-evicted to a size cap:
+
+  • results – finished highlighted PDFs, keyed by
+              (upload hash, platform, highlighter version, title)
+  • plans   – the parsed highlight plan each highlighter returns
+              (marks + keeper colours, see layout.py),
+              keyed without the title, so a title-only change skips
+              extraction and parsing and just redoes the final write.
+  • detected – the platform detected for an upload sent with
+              platform=auto (see detect.py), keyed by upload hash and
+              profile versions, so an auto request can find its result
+              without opening the PDF.
+
+The default root sits in the shared temp directory, where another local
+user could create it first and plant entries for us to serve. It is
+therefore created private (0700) on first use, and the caches are disabled,
+with an error logged, if it turns out to belong to someone else. Plans are
+stored as JSON, never pickle, so a cache entry is only ever data.
+
+Configuration (environment):
+    HIGHLIGHT_CACHE_DIR      – cache root (default: <tmp>/legal-eagle-cache)
+    HIGHLIGHT_CACHE_MB       – result cache cap in MB, 0 disables (default 512)
+    HIGHLIGHT_PLAN_CACHE_MB  – plan cache cap in MB, 0 disables (default 128)
+    HIGHLIGHT_DETECT_CACHE_KB – detected-platform cache cap in KB, 0 disables (default 256)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.environ.get("HIGHLIGHT_CACHE_DIR", Path(tempfile.gettempdir()) / "legal-eagle-cache"))
+RESULT_CACHE_MB = int(os.environ.get("HIGHLIGHT_CACHE_MB", "512"))
+PLAN_CACHE_MB = int(os.environ.get("HIGHLIGHT_PLAN_CACHE_MB", "128"))
+DETECT_CACHE_KB = int(os.environ.get("HIGHLIGHT_DETECT_CACHE_KB", "256"))
+
+
+def cache_key(*parts) -> str:
+    """Stable hex key for the given parts (e.g. upload digest, platform, version)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+_dir_ok = None
+
+def cache_dir_ok() -> bool:
+    """
+    Create CACHE_DIR private to this user on first use, and check it is ours.
+
+    False (and the caches stay off) when it is not a directory owned by this
+    user, e.g. one another user created first in the shared temp directory.
+    """
+    global _dir_ok
+    if _dir_ok is None:
+        try:
+            CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            st = CACHE_DIR.lstat()  # a symlink planted in its place is refused too
+            if not stat.S_ISDIR(st.st_mode) or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+                raise PermissionError(f"{CACHE_DIR} is not a directory owned by this user")
+            if st.st_mode & 0o077:
+                CACHE_DIR.chmod(0o700)
+            _dir_ok = True
+        except OSError as e:
+            log.error(f"Disk caches disabled: {e}")
+            _dir_ok = False
+    return _dir_ok
+
+
+class DiskLRU:
+    """
+    A directory of `<key><suffix>` files capped at `max_bytes`.
+
+    Recency is tracked with the file mtime (touched on every hit), so the cache
+    survives process restarts and is shared by every worker on the machine.
+    Writes go through a temp file + os.replace, so readers never see a partial entry.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, suffix: str = ""):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and cache_dir_ok()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Path | None:
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_file(self, key: str, src: Path) -> Path:
+        """Move `src` into the cache and return its new location."""
+        if not self.enabled:
+            return Path(src)
+        self.root.mkdir(parents=True, exist_ok=True)
+        dest = self.path_for(key)
+        try:
+            os.replace(src, dest)
+        except OSError:
+            # different filesystem: stage next to the cache, then swap in atomically
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+            os.close(fd)
+            shutil.move(src, tmp)
+            os.replace(tmp, dest)
+        self._evict(keep=dest)
+        return dest
+
+    def put_bytes(self, key: str, data: bytes) -> Path | None:
+        if not self.enabled:
+            return None
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return self.put_file(key, Path(tmp))
+
+    def _evict(self, keep: Path):
+        with self._lock:
+            entries = []
+            for path in self.root.glob(f"*{self.suffix}"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another worker
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+                log.info(f"Evicted cache entry {path.name}")
+
+
+class PlanCache(DiskLRU):
+    """Highlight plans (see layout.highlight), stored as JSON."""
+
+    def load(self, key: str):
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            marks, colours = json.loads(path.read_bytes())
+            return ([(pno, tuple(rect), tuple(colour)) for pno, rect, colour in marks],
+                    {name: tuple(colour) for name, colour in colours.items()})
+        except Exception as e:
+            # A truncated or stale entry is just a miss
+            log.warning(f"Discarding unreadable plan cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, key: str, plan) -> None:
+        marks, colours = plan
+        self.put_bytes(key, json.dumps([marks, colours], separators=(",", ":")).encode("utf-8"))
+
+
+class DetectCache(DiskLRU):
+    """Detected platform names, one small text file per upload."""
+
+    def load(self, key: str) -> str | None:
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding="utf-8") or None
+        except OSError:
+            return None  # evicted between the lookup and the read
+
+    def store(self, key: str, platform: str) -> None:
+        self.put_bytes(key, platform.encode("utf-8"))
+
+
+results = DiskLRU(CACHE_DIR / "results", RESULT_CACHE_MB * 1024 * 1024, suffix=".pdf")
+plans = PlanCache(CACHE_DIR / "plans", PLAN_CACHE_MB * 1024 * 1024, suffix=".json")
+detected = DetectCache(CACHE_DIR / "detected", DETECT_CACHE_KB * 1024, suffix=".txt")
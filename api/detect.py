@@ -0,0 +1,49 @@
+"""
+detect.py
+
+Guess which billing platform produced an invoice from the raw text of its
+first few pages, without word extraction or row grouping.
+
+Each platform profile (see profiles.py) has a list of (pattern, weight)
+markers; the platform with the highest total score wins, and None is
+returned when nothing matches. Pages are scanned one at a time and the scan
+stops as soon as one platform leads by DECISIVE points, which on real
+invoices is usually after the first page.
+"""
+from extract import open_document
+from profiles import PROFILES
+
+DETECT_PAGES = 3
+DECISIVE = 5        # a lead this large (one strong marker) ends the scan early
+
+# platform → [(compiled pattern, weight), …], from each profile's "detect" markers
+MARKERS = {name: profile.detect for name, profile in PROFILES.items()}
+
+
+def score_text(text: str) -> dict[str, int]:
+    text = " ".join(text.split())
+    return {
+        platform: sum(weight for rx, weight in markers if rx.search(text))
+        for platform, markers in MARKERS.items()
+    }
+
+
+def detect_platform(src, max_pages: int = DETECT_PAGES) -> str | None:
+    """Return a platform name (e.g. "T360") or None for a PDF path, bytes or open fitz document."""
+    doc = src if hasattr(src, "page_count") else open_document(src)
+    text = ""
+    try:
+        for pno in range(min(max_pages, doc.page_count)):
+            # re-score the text so far, so markers split across a page break still count
+            text += " " + doc[pno].get_text()
+            scores = score_text(text)
+            best, runner_up = sorted(scores.values(), reverse=True)[:2]
+            if best - runner_up >= DECISIVE:
+                break
+    finally:
+        if doc is not src:
+            doc.close()
+    if not text:
+        return None
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else None
@@ -0,0 +1,290 @@
+"""
+extract.py
+
+Word-extraction engines shared by the highlighters.
+
+Every engine returns pdfplumber-style word dicts:
+    {"text", "x0", "top", "x1", "bottom", "page_number"}
+with a 1-based `page_number`, so the layout engine (layout.py) works the
+same whichever engine produced the words.
+
+  • "pymupdf"    – default; reads words from the fitz document the highlighter
+                   already has open, so each invoice is parsed once.
+  • "pdfplumber" – the original extractor, opened alongside the fitz document.
+
+The default can be overridden with the HIGHLIGHT_ENGINE environment variable.
+
+`open_document` accepts a path, a bytes-like object or a binary file object,
+so uploads can be processed entirely in memory. `map_source` turns a large
+upload's spooled file into a read-only memory map; fitz opens that buffer in
+place and the pdfplumber engine reads it through `BufferFile`, so however
+many stages read the invoice, no stage holds another copy of it.
+
+Page ranges ("120-180", "7", "1500-"; 1-based, inclusive) are parsed by
+`parse_pages` and resolved against a document by `page_span`.
+
+`iter_page_rows` can also fan extraction out over a process pool
+(HIGHLIGHT_WORKERS > 1); pages are merged back in order, so the rows are
+identical to the serial path. Only a few chunks per worker are in flight
+at a time, so memory stays flat however far the parser lags behind the
+workers. Documents opened from memory (every API
+upload) are written once to a temporary file for the workers to open.
+Daemonic processes (the warm pool's workers, see workers.py) cannot start a
+pool of their own and always extract in-process.
+
+Extraction and row grouping are timed as the "extract" and "group" stages,
+with "words" and "rows" counters, on the current instrument (instrument.py).
+"""
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+
+import instrument
+from pools import ProcessPool
+
+DEFAULT_ENGINE = os.environ.get("HIGHLIGHT_ENGINE", "pymupdf")
+DEFAULT_WORKERS = int(os.environ.get("HIGHLIGHT_WORKERS", "1"))
+PARALLEL_MIN_PAGES = 16      # below this, pool start-up costs more than it saves
+CHUNKS_PER_WORKER = 4        # small enough chunks to balance uneven pages
+MAX_CHUNK_PAGES = 32         # and bounded, so rows held in flight stay small
+INFLIGHT_PER_WORKER = 2      # chunks submitted ahead of the parser, per worker
+MAP_MIN_BYTES = 1 << 20      # smaller sources are simply read (and spooled in memory anyway)
+
+
+class PageRangeError(ValueError):
+    """A page range that is malformed or lies outside the document."""
+
+# ─────────────── Engines ──────────────────────────────────────
+class PyMuPDFEngine:
+    """Words from `page.get_text("words")` on an open fitz document."""
+    name = "pymupdf"
+
+    def __init__(self, doc, **plumber_opts):
+        import fitz
+
+        # boxes the font size tall, as pdfplumber's are, rather than ascender to
+        # descender, which on an 11 pt line pitch would overlap the rows around them
+        fitz.TOOLS.set_small_glyph_heights(True)
+        # pdfplumber tolerances have no PyMuPDF equivalent and are ignored
+        self.doc = doc
+
+    def words(self, pno):
+        return [
+            {"text": text, "x0": x0, "top": y0, "x1": x1, "bottom": y1,
+             "page_number": pno + 1}
+            for x0, y0, x1, y1, text, *_ in self.doc[pno].get_text("words")
+        ]
+
+    def close(self):
+        pass  # the fitz document belongs to the caller
+
+
+class PdfplumberEngine:
+    """Words from `page.extract_words()`, opening the same source with pdfplumber."""
+    name = "pdfplumber"
+
+    def __init__(self, doc, **plumber_opts):
+        import pdfplumber  # only needed when this engine is selected
+        # read the same buffer fitz was given when the document came from memory
+        self.pdf = pdfplumber.open(doc.name or source_file(doc.stream))
+        self.opts = plumber_opts
+
+    def words(self, pno):
+        page = self.pdf.pages[pno]
+        words = page.extract_words(**self.opts)
+        for w in words:
+            w["page_number"] = page.page_number
+        return words
+
+    def close(self):
+        self.pdf.close()
+
+
+ENGINES = {engine.name: engine for engine in (PyMuPDFEngine, PdfplumberEngine)}
+
+# ─────────────── Sources ──────────────────────────────────────
+class BufferFile(io.RawIOBase):
+    """A read-only, seekable file over a bytes-like object; reads copy only what they return."""
+
+    def __init__(self, buf):
+        self.buf = memoryview(buf).cast("B")
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self.buf) - self.pos))
+        b[:n] = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: len(self.buf)}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+def source_file(buf):
+    """A binary file object reading `buf` (bytes, memoryview, …) without copying it whole."""
+    if isinstance(buf, bytes):
+        return io.BytesIO(buf)    # shares the bytes until written to
+    return io.BufferedReader(BufferFile(buf))
+
+def map_source(f, min_size: int = MAP_MIN_BYTES):
+    """
+    The contents of binary file `f`: a read-only memoryview over a memory
+    map of its file when it is at least `min_size` bytes and has one (e.g. an
+    upload spooled to disk), else the bytes. The map lives as long as the view.
+    """
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    if size >= min_size:
+        try:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass  # no real file behind it; read it instead
+    return f.read()
+
+def open_document(src):
+    """Open a PDF from a path, bytes-like object or binary file object."""
+    import fitz  # deferred so importing this module stays cheap
+
+    if isinstance(src, (str, os.PathLike)):
+        return fitz.open(src)
+    if hasattr(src, "read"):
+        src = map_source(src)
+    return fitz.open(stream=src, filetype="pdf")
+
+# ─────────────── Page ranges ──────────────────────────────────
+_PAGES = re.compile(r"\s*(\d+)\s*(?:(-)\s*(\d+)?)?\s*")
+
+def parse_pages(spec: str) -> tuple[int, int | None]:
+    """(first, last) 1-based pages for "120-180", "7" or "1500-" (last None: to the end)."""
+    m = _PAGES.fullmatch(spec or "")
+    if m is None:
+        raise PageRangeError(f"Invalid page range {spec!r}; use e.g. 120-180, 7 or 1500-")
+    first = int(m.group(1))
+    last = None if m.group(2) and m.group(3) is None else int(m.group(3) or first)
+    if first < 1 or (last is not None and last < first):
+        raise PageRangeError(f"Invalid page range {spec!r}")
+    return first, last
+
+def page_span(spec: str, page_count: int) -> range:
+    """Page indices covered by the page range `spec` in a document of `page_count` pages."""
+    first, last = parse_pages(spec)
+    if first > page_count:
+        raise PageRangeError(f"Page range {spec!r} starts after the last page ({page_count})")
+    return range(first - 1, min(last or page_count, page_count))
+
+# ─────────────── Extraction ───────────────────────────────────
+class open_engine:
+    """
+    Context manager yielding a `words(page_index)` callable for `doc`.
+
+    `plumber_opts` are forwarded to pdfplumber's `extract_words` when that
+    engine is selected.
+    """
+
+    def __init__(self, doc, engine=None, **plumber_opts):
+        name = engine or DEFAULT_ENGINE
+        if name not in ENGINES:
+            raise ValueError(f"Unknown extraction engine: {name!r} (choose from {', '.join(ENGINES)})")
+        self.engine = ENGINES[name](doc, **plumber_opts)
+
+    def __enter__(self):
+        return self.engine.words
+
+    def __exit__(self, *exc):
+        self.engine.close()
+
+
+# ─────────────── Page-parallel extraction ─────────────────────
+pool = ProcessPool("extraction", DEFAULT_WORKERS)
+
+def get_pool(workers):
+    """Return the shared process pool, resized to `workers` processes."""
+    pool.resize(workers)
+    return pool
+
+def shutdown_pool():
+    pool.shutdown()
+
+@contextmanager
+def _shared_source(doc):
+    """A path worker processes can open for `doc`: its file, or a temporary copy of its buffer."""
+    if doc.name:
+        yield doc.name
+        return
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="legal-eagle-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(doc.stream)
+        yield path
+    finally:
+        os.unlink(path)
+
+def _extract_chunk(src, pages, row_builder, engine, plumber_opts):
+    """Worker: open `src` and build rows for each page index in `pages`."""
+    with open_document(src) as doc, open_engine(doc, engine, **plumber_opts) as page_words:
+        return [list(row_builder(page_words(pno))) for pno in pages]
+
+def iter_page_rows(doc, row_builder, engine=None, workers=None, start=0, stop=None, **plumber_opts):
+    """
+    Yield `row_builder(words)` as a list of rows for every page of `doc` from
+    page index `start` up to (not including) `stop`, in order.
+
+    With `workers` > 1 and enough pages, the page range is split into chunks
+    that worker processes extract from their own copy of the source file; a
+    document opened from memory is first written to a temporary file, kept
+    until the last chunk is back. At most INFLIGHT_PER_WORKER chunks per
+    worker are submitted ahead of the caller, so finished rows never pile
+    up faster than they are consumed. Daemonic processes extract in-process.
+    """
+    workers = DEFAULT_WORKERS if workers is None else workers
+    n = doc.page_count if stop is None else min(stop, doc.page_count)
+    if workers <= 1 or n - start < PARALLEL_MIN_PAGES or multiprocessing.current_process().daemon:
+        with open_engine(doc, engine, **plumber_opts) as page_words:
+            for pno in range(start, n):
+                with instrument.stage("extract"):
+                    words = page_words(pno)
+                with instrument.stage("group"):
+                    rows = list(row_builder(words))
+                instrument.add("words", len(words))
+                instrument.add("rows", len(rows))
+                yield rows
+        return
+
+    size = min(MAX_CHUNK_PAGES, max(1, -(-(n - start) // (workers * CHUNKS_PER_WORKER))))
+    chunks = (range(i, min(i + size, n)) for i in range(start, n, size))
+    pool = get_pool(workers)
+    with _shared_source(doc) as src:
+        def submit(chunk):
+            return pool.submit(_extract_chunk, src, chunk, row_builder, engine, plumber_opts)
+
+        futures = deque(map(submit, itertools.islice(chunks, workers * INFLIGHT_PER_WORKER)))
+        try:
+            while futures:
+                # workers extract and group together; the wait is all we can time here
+                with instrument.stage("extract"):
+                    chunk_rows = futures.popleft().result()
+                futures.extend(map(submit, itertools.islice(chunks, 1)))
+                for rows in chunk_rows:
+                    instrument.add("words", sum(map(len, rows)))
+                    instrument.add("rows", len(rows))
+                    yield rows
+        finally:
+            for future in futures:
+                future.cancel()
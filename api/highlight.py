@@ -1,39 +1,41 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import FileResponse
-import tempfile
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hashlib
+import io
+import json
 import os
-from pathlib import Path
 import sys
-import shutil
+import zipfile
+from urllib.parse import quote
 import logging
 import importlib.metadata
+import functools
+from contextlib import asynccontextmanager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=None)
 def get_library_versions():
-    """Get versions of all libraries from requirements.txt for debugging deployment issues"""
+    """Get versions of all libraries from requirements.txt for debugging deployment issues.
+
+    Computed on first request rather than at import, to keep cold starts short.
+    """
     requirements_libraries = [
         'fastapi',
         'python-multipart',
         'uvicorn',
         'pdfplumber',
         'PyMuPDF',
-        'pypdf'
     ]
     
     versions = {}
     for lib in requirements_libraries:
         try:
-            # Handle special cases for library name differences
-            if lib == 'python-multipart':
-                version = importlib.metadata.version('python-multipart')
-            elif lib == 'PyMuPDF':
-                version = importlib.metadata.version('PyMuPDF')
-            else:
-                version = importlib.metadata.version(lib)
-            versions[lib] = version
+            versions[lib] = importlib.metadata.version(lib)
         except importlib.metadata.PackageNotFoundError:
             versions[lib] = "NOT FOUND"
         except Exception as e:
@@ -41,47 +43,55 @@ def get_library_versions():
     
     return versions
 
-def log_library_versions():
-    """Log versions of all libraries from requirements.txt for debugging deployment issues"""
-    versions = get_library_versions()
-    log.info("=== LIBRARY VERSIONS DEBUG INFO ===")
-    for lib, version in versions.items():
-        log.info(f"{lib}: {version}")
-    log.info("=== END LIBRARY VERSIONS ===")
-
-# Log library versions on startup
-log_library_versions()
-
 # Add the current directory to Python path to import our highlight scripts
 sys.path.append(os.path.dirname(__file__))
 
-try:
-    from highlight_ac_simple import highlight_invoice as highlight_t360
-    log.info("Successfully imported highlight_t360 from highlight_ac_simple")
-except ImportError as e:
-    log.error(f"Failed to import highlight_t360: {e}")
-    # Fallback if import fails
-    def highlight_t360(input_path, output_path, title=None):
-        log.info("Using fallback highlight_t360 (file copy)")
-        # Simple fallback - just copy the file
-        shutil.copy2(input_path, output_path)
-
-try:
-    from highlight_counsellink import highlight_counsellink_invoice
-    log.info("Successfully imported highlight_counsellink_invoice from highlight_counsellink")
-except ImportError as e:
-    log.error(f"Failed to import highlight_counsellink_invoice: {e}")
-    # Fallback if import fails
-    def highlight_counsellink_invoice(input_path, output_path, title=None):
-        log.info("Using fallback highlight_counsellink_invoice")
-        raise HTTPException(status_code=501, detail="CounselLink highlighting not available")
-
-app = FastAPI()
+# Highlighters (and PyMuPDF / pdfplumber with them) are imported on first use
+# per platform; see platforms.py. Nothing below pulls in a PDF library.
+import batch
+import cache
+import extract
+import instrument
+import jobs
+import summary
+import workers
+from detect import detect_platform
+from platforms import PLATFORMS, get_highlighter
+from annotate import ANNOT_MODES, DEFAULT_ANNOT_MODE
+from output import SAVE_MODES, DEFAULT_SAVE_MODE
+
+@asynccontextmanager
+async def lifespan(app):
+    # the extraction (HIGHLIGHT_WORKERS > 1) and batch process pools are
+    # created on first use and shared by every request for the life of the app;
+    # the warm pool (self-hosted, HIGHLIGHT_POOL=1) starts warming up right away
+    if workers.POOL_ENABLED:
+        workers.get_pool()
+    yield
+    extract.shutdown_pool()
+    batch.shutdown_pool()
+    jobs.shutdown_manager()
+    workers.shutdown_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get("/python-api/health")
+async def health():
+    """
+    Liveness check. In self-hosted pool mode (HIGHLIGHT_POOL=1) it also
+    reports worker utilisation and queue depth, and answers 503 while no
+    worker is alive.
+    """
+    body = {"status": "ok", "pool": workers.pool_stats()}
+    if workers.POOL_ENABLED and not (body["pool"] and body["pool"]["alive"]):
+        body["status"] = "starting" if body["pool"] else "down"
+        return JSONResponse(status_code=503, content=body)
+    return body
 
 @app.get("/python-api/debug/versions")
 async def debug_versions():
     """Debug endpoint to check library versions - accessible in browser"""
-    versions = get_library_versions()
+    versions = dict(get_library_versions())
     return {
         "message": "Library versions installed on Vercel",
         "versions": versions,
@@ -89,59 +99,382 @@ async def debug_versions():
         "platform": sys.platform
     }
 
+# /python-api/debug/profile runs a request under the sampling profiler; off by default
+PROFILING_ENABLED = os.environ.get("HIGHLIGHT_PROFILING", "") == "1"
+
+STREAM_CHUNK = 256 * 1024
+BATCH_CONTENT_TYPES = {"application/pdf", "application/zip", "application/x-zip-compressed"}
+
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def pdf_response(data: bytes, filename: str, headers: dict | None = None) -> StreamingResponse:
+    """Stream an in-memory PDF back as a download named `filename`."""
+    disposition = content_disposition(filename)
+    view = memoryview(data)
+    return StreamingResponse(
+        (view[i:i + STREAM_CHUNK] for i in range(0, len(view), STREAM_CHUNK)),
+        media_type="application/pdf",
+        headers={"Content-Disposition": disposition, "Content-Length": str(len(data)), **(headers or {})},
+    )
+
+def summary_response(result: dict, format: str, filename: str, headers: dict | None = None) -> Response:
+    """The keeper summary (see summary.py) as JSON, or as a CSV download named after `filename`."""
+    if format == "json":
+        return JSONResponse(result, headers=headers)
+    csv_name = os.path.splitext(filename)[0] + ".csv"
+    return Response(summary.to_csv(result), media_type="text/csv",
+                    headers={"Content-Disposition": content_disposition(csv_name), **(headers or {})})
+
+def log_timings(event: str, inst: instrument.Instrument, **fields):
+    """One structured (JSON) log line per request with its stage timings and counters."""
+    log.info(json.dumps({"event": event, **fields, **inst.as_dict()}))
+
 @app.post("/python-api/highlight")
-async def process_pdf_endpoint(file: UploadFile = File(...), platform: str = Form(...)):
+async def process_pdf_endpoint(file: UploadFile = File(...), platform: str = Form(batch.AUTO),
+                               save_mode: str | None = Form(None), annot_mode: str | None = Form(None),
+                               format: str = Form("pdf"), pages: str | None = Form(None)):
+    """
+    Highlight one invoice and return the PDF, or with `format=json` / `csv`
+    only its keeper summary (see summary.py), which skips annotation and saving.
+    With `pages` (e.g. "120-180") only that page range is read and returned.
+    """
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     if not platform:
         raise HTTPException(status_code=400, detail="Platform selection is required")
-    
-    log.info(f"Processing PDF for platform: {platform}")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_input_file:
-        shutil.copyfileobj(file.file, tmp_input_file)
-        input_path = Path(tmp_input_file.name)
+    if platform not in PLATFORMS and platform != batch.AUTO:
+        log.error(f"Unsupported platform: {platform}")
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
 
-    output_path = input_path.with_suffix(".highlighted.pdf")
+    # "fast" trades a larger file for a much quicker save (see output.py)
+    save_mode = save_mode or DEFAULT_SAVE_MODE
+    if save_mode not in SAVE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported save mode: {save_mode}")
+
+    # "keeper" writes one multi-quad highlight per keeper and page (see annotate.py)
+    annot_mode = annot_mode or DEFAULT_ANNOT_MODE
+    if annot_mode not in ANNOT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported annotation mode: {annot_mode}")
+
+    format = format or "pdf"
+    if format != "pdf" and format not in summary.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    try:
+        page_range = extract.parse_pages(pages) if pages else None
+    except extract.PageRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Process the upload in memory: no temp input or output files to clean up.
+    # A large upload is memory-mapped from its spooled file rather than read
+    # into a copy; every stage below reads that one buffer (see extract.py).
+    data = await run_in_threadpool(extract.map_source, file.file)
+    # hashing a large upload and the cache's disk I/O below stay off the event loop too
+    digest = await run_in_threadpool(lambda: hashlib.sha256(data).hexdigest())
+
+    if platform == batch.AUTO:
+        # remembered per upload, so a repeat can hit the result cache below
+        # without opening the PDF at all
+        detect_key = cache.cache_key(digest, "detect", *(f"{name}/{p.version}" for name, p in PLATFORMS.items()))
+        platform = await run_in_threadpool(cache.detected.load, detect_key)
+        if platform in PLATFORMS:
+            log.info(f"Detection cache hit: {platform}")
+        else:
+            # a cheap scan of the first pages' text (see detect.py)
+            try:
+                platform = await run_in_threadpool(detect_platform, data)
+            except Exception as e:
+                log.warning(f"Platform detection failed: {e}")
+                platform = None
+            if platform is None:
+                raise HTTPException(status_code=422, detail="Could not detect the billing platform; "
+                                                            f"choose one of {', '.join(PLATFORMS)}")
+            log.info(f"Detected platform: {platform}")
+            await run_in_threadpool(cache.detected.store, detect_key, platform)
+    # the engine (and PyMuPDF) is only loaded once the result cache has missed
+    version = PLATFORMS[platform].version
+    platform_header = {"X-Highlight-Platform": platform}
+
+    log.info(f"Processing PDF for platform: {platform}")
 
     try:
         # Extract the original filename to use as the title
         original_filename = file.filename or "highlighted.pdf"
-        log.info(f"Processing file: {input_path} -> {output_path} with title {original_filename}")
-        
-        # Route to appropriate highlighter based on platform
-        if platform == "T360":
-            log.info("Routing to T360 highlighter")
-            highlight_t360(str(input_path), str(output_path), title=original_filename)
-        elif platform == "CounselLink":
-            log.info("Routing to CounselLink highlighter")
-            highlight_counsellink_invoice(str(input_path), str(output_path), title=original_filename)
+
+        if format in summary.FORMATS:
+            log.info(f"Summarising {original_filename} as {format}")
+            if workers.POOL_ENABLED:
+                future = workers.get_pool().submit(workers.summary_job, platform, bytes(data),
+                                                   original_filename, pages)
+                result, inst = await asyncio.wrap_future(future)
+            else:
+                inst = instrument.Instrument()
+                result = await run_in_threadpool(inst.run, summary.summarize, PLATFORMS[platform], data,
+                                                 title=original_filename, progress=inst, pages=pages)
+            log_timings("summary", inst, file=original_filename, platform=platform, bytes_in=len(data))
+            return summary_response(result, format, original_filename,
+                                    headers={**inst.headers(), **platform_header})
+
+        key_parts = (save_mode, annot_mode, original_filename, page_range)
+        result_key = cache.cache_key(digest, platform, version, *key_parts)
+        cached_path = await run_in_threadpool(cache.results.get, result_key)
+        if cached_path:
+            log.info(f"Result cache hit for {original_filename} ({result_key[:12]})")
+            return FileResponse(
+                path=str(cached_path),
+                media_type="application/pdf",
+                filename=original_filename,
+                headers={"Server-Timing": 'cache;desc="result hit"', **platform_header},
+            )
+
+        highlighter, loaded_version = get_highlighter(platform)
+        if loaded_version != version:
+            # the engine could not be imported and a fallback stands in (see platforms.py)
+            version = loaded_version
+            result_key = cache.cache_key(digest, platform, version, *key_parts)
+
+        # A cached plan skips extraction and parsing; only the final write is redone
+        plan_key = cache.cache_key(digest, platform, version, page_range)
+        plan = await run_in_threadpool(cache.plans.load, plan_key)
+        if plan is not None:
+            log.info(f"Plan cache hit for {original_filename} ({plan_key[:12]})")
+
+        log.info(f"Processing {len(data)} bytes in memory with title {original_filename}")
+        log.info(f"Routing to {platform} highlighter")
+        if workers.POOL_ENABLED:
+            # a prewarmed worker process, with timeouts and recycling (see workers.py);
+            # the upload is sent over a pipe, so a mapped one is copied into bytes here
+            future = workers.get_pool().submit(workers.highlight_job, platform, bytes(data), original_filename,
+                                               plan, save_mode, annot_mode, pages)
+            new_plan, result, inst = await asyncio.wrap_future(future)
         else:
-            log.error(f"Unsupported platform: {platform}")
-            raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
-        
-        log.info(f"Finished processing. Checking for output file at {output_path}")
+            output = io.BytesIO()
+            inst = instrument.Instrument()
+            # run the blocking highlighter off the event loop so other requests keep flowing
+            new_plan = await run_in_threadpool(inst.run, highlighter, data, output, title=original_filename,
+                                               plan=plan, save_mode=save_mode, annot_mode=annot_mode,
+                                               progress=inst, pages=pages)
+            result = output.getvalue()
 
-        if not output_path.exists():
-            log.error("Output file not found after processing")
+        log.info(f"Finished processing. Output is {len(result)} bytes")
+        log_timings("highlight", inst, file=original_filename, platform=platform,
+                    bytes_in=len(data), bytes_out=len(result), plan_cache_hit=plan is not None)
+        if not inst.counts.get("annotations"):
+            log.warning(f"No highlights added to {original_filename} as {platform}; "
+                        f"is it really a {platform} invoice?")
+
+        if not result:
+            log.error("No output produced by highlighter")
             raise HTTPException(status_code=500, detail="Failed to create highlighted PDF")
 
-        log.info(f"Returning highlighted file: {output_path}")
+        if plan is None and new_plan is not None:
+            await run_in_threadpool(cache.plans.store, plan_key, new_plan)
+        await run_in_threadpool(cache.results.put_bytes, result_key, result)
+
+        log.info(f"Returning highlighted file: {original_filename}")
         # Use the original filename for the downloaded file
-        return FileResponse(
-            path=str(output_path),
-            media_type="application/pdf",
-            filename=original_filename,
-        )
+        return pdf_response(result, original_filename, headers={**inst.headers(), **platform_header})
     except HTTPException:
-        # Re-raise HTTP exceptions (like the CounselLink 501 error)
         raise
+    except NotImplementedError as e:
+        # The platform's highlighter could not be imported (see platforms.py)
+        raise HTTPException(status_code=501, detail=str(e))
+    except extract.PageRangeError as e:
+        # e.g. a range starting after the last page
+        raise HTTPException(status_code=400, detail=str(e))
+    except workers.PoolFull as e:
+        log.warning(f"Rejecting request: {e}")
+        raise HTTPException(status_code=429, detail="All workers are busy, retry later",
+                            headers={"Retry-After": "10"})
+    except workers.JobTimeout as e:
+        log.error(f"Highlighting {file.filename} timed out: {e}")
+        raise HTTPException(status_code=504, detail=f"Highlighting timed out ({e})")
     except Exception as e:
         log.error(f"An error occurred during highlighting: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An error occurred during highlighting.")
-    finally:
-        # Clean up the temporary input file
-        if input_path.exists():
-            log.info(f"Cleaning up temporary file: {input_path}")
-            os.unlink(input_path)
+
+@app.post("/python-api/debug/profile")
+async def debug_profile(file: UploadFile = File(...), platform: str = Form(batch.AUTO),
+                        save_mode: str | None = Form(None), annot_mode: str | None = Form(None),
+                        pages: str | None = Form(None), interval_ms: float = Form(5.0),
+                        format: str = Form("json")):
+    """
+    Highlight one invoice under the sampling profiler (no caches) and return
+    the profile instead of the PDF: stage timings, the hottest functions and
+    collapsed stacks (`format=collapsed` returns only those, for flamegraph.pl
+    or speedscope). `platform`, `save_mode`, `annot_mode` and `pages` work as
+    on /python-api/highlight; detection runs before the profiler starts.
+    Enabled with HIGHLIGHT_PROFILING=1.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if platform not in PLATFORMS and platform != batch.AUTO:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
+    save_mode = save_mode or DEFAULT_SAVE_MODE
+    if save_mode not in SAVE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported save mode: {save_mode}")
+    annot_mode = annot_mode or DEFAULT_ANNOT_MODE
+    if annot_mode not in ANNOT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported annotation mode: {annot_mode}")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if not 0.5 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 0.5 and 1000")
+    try:
+        if pages:
+            extract.parse_pages(pages)
+    except extract.PageRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    data = await file.read()
+    if platform == batch.AUTO:
+        try:
+            platform = await run_in_threadpool(detect_platform, data)
+        except Exception as e:
+            log.warning(f"Platform detection failed: {e}")
+            platform = None
+        if platform is None:
+            raise HTTPException(status_code=422, detail="Could not detect the billing platform; "
+                                                        f"choose one of {', '.join(PLATFORMS)}")
+    highlighter, _version = get_highlighter(platform)
+    inst = instrument.Instrument()
+    try:
+        _plan, profiler = await run_in_threadpool(
+            inst.run, instrument.profile, highlighter, data, io.BytesIO(),
+            title=file.filename, save_mode=save_mode, annot_mode=annot_mode, progress=inst, pages=pages,
+            interval=interval_ms / 1000,
+        )
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except extract.PageRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"An error occurred while profiling: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An error occurred during highlighting.")
+    log_timings("profile", inst, file=file.filename, platform=platform, samples=profiler.samples)
+
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(), headers=inst.headers())
+    return JSONResponse(
+        {
+            "file": file.filename,
+            "platform": platform,
+            "timings": inst.as_dict(),
+            "interval_ms": interval_ms,
+            "samples": profiler.samples,
+            "top": profiler.top(),
+            "collapsed": profiler.collapsed(),
+        },
+        headers=inst.headers(),
+    )
+
+@app.post("/python-api/highlight/batch")
+async def batch_endpoint(files: list[UploadFile] = File(...), platform: str = Form(batch.AUTO),
+                         platforms: str | None = Form(None), save_mode: str | None = Form(None)):
+    """
+    Highlight many invoices (PDFs and/or ZIPs of PDFs) and stream back a ZIP
+    with one highlighted PDF per input plus a manifest.json of per-file status.
+
+    `platform` applies to every file ("auto" detects per file); `platforms` is
+    an optional JSON object of filename → platform overrides.
+    """
+    choices = set(PLATFORMS) | {batch.AUTO}
+    try:
+        overrides = json.loads(platforms) if platforms else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="platforms must be a JSON object")
+    if not isinstance(overrides, dict):
+        raise HTTPException(status_code=400, detail="platforms must be a JSON object")
+    for name, choice in [("*", platform), *overrides.items()]:
+        if choice not in choices:
+            raise HTTPException(status_code=400, detail=f"Unsupported platform for {name}: {choice}")
+
+    save_mode = save_mode or DEFAULT_SAVE_MODE
+    if save_mode not in SAVE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported save mode: {save_mode}")
+
+    uploads = []
+    for upload in files:
+        name = upload.filename or f"file{len(uploads) + 1}.pdf"
+        if upload.content_type not in BATCH_CONTENT_TYPES and not name.lower().endswith((".pdf", ".zip")):
+            raise HTTPException(status_code=400, detail=f"Only PDF or ZIP files are allowed: {name}")
+        uploads.append((name, await upload.read()))
+
+    try:
+        entries, skipped = await run_in_threadpool(batch.expand_uploads, uploads)  # unzipping can be slow
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not entries:
+        raise HTTPException(status_code=400, detail="No PDF files in upload")
+
+    log.info(f"Batch of {len(entries)} PDFs ({len(skipped)} skipped), default platform {platform}")
+    entry_platforms = [overrides.get(name, platform) for name, _ in entries]
+    return StreamingResponse(
+        batch.stream_batch_zip(entries, entry_platforms, save_mode, skipped),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="highlighted.zip"'},
+    )
+
+@app.post("/python-api/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), platform: str = Form(batch.AUTO),
+                     save_mode: str | None = Form(None), annot_mode: str | None = Form(None),
+                     pages: str | None = Form(None)):
+    """
+    Queue a highlight job and return its id immediately. Takes the fields of
+    /python-api/highlight except `format`: a job always produces the PDF. Poll
+    /python-api/jobs/{job_id} for progress and fetch the PDF from
+    /python-api/jobs/{job_id}/result. Answers 429 when the queue is full.
+    """
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    if platform not in PLATFORMS and platform != batch.AUTO:
+        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
+    save_mode = save_mode or DEFAULT_SAVE_MODE
+    if save_mode not in SAVE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported save mode: {save_mode}")
+    annot_mode = annot_mode or DEFAULT_ANNOT_MODE
+    if annot_mode not in ANNOT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported annotation mode: {annot_mode}")
+    if pages:
+        try:
+            extract.parse_pages(pages)
+        except extract.PageRangeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    data = await file.read()
+    try:
+        job = jobs.get_manager().submit(data, file.filename or "highlighted.pdf", platform, save_mode,
+                                        annot_mode, pages or None)
+    except jobs.QueueFull as e:
+        log.warning(f"Rejecting job: {e}")
+        return JSONResponse(status_code=429, content={"detail": "Too many jobs in progress, retry later"},
+                            headers={"Retry-After": "10"})
+    return job.to_dict()
+
+def _get_job(job_id: str) -> jobs.Job:
+    job = jobs.get_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+@app.get("/python-api/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job(job_id).to_dict()
+
+@app.get("/python-api/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = _get_job(job_id)
+    if job.status == jobs.FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    path = await run_in_threadpool(jobs.get_manager().result, job)
+    if path is None:
+        raise HTTPException(status_code=410, detail="Job result is no longer available")
+    return FileResponse(path=str(path), media_type="application/pdf", filename=job.filename)
@@ -1,118 +1,76 @@
 #!/usr/bin/env python3
 """
-highlight_counsellink.py · rev J  – border-less highlights
+highlight_counsellink.py · rev N  – border-less highlights
 
 • Uses Highlight annotations (page.add_highlight_annot)  
 • Custom colour + opacity, but zero outline  
 • Text underneath remains perfectly crisp thanks to Multiply blend
+
+The layout rules are the "CounselLink" profile in profiles.py, run by the
+shared engine in layout.py; this module keeps the CounselLink entry points
+and CLI.
 """
 
 from __future__ import annotations
-import sys, re, itertools, pdfplumber, fitz
-from typing import Dict, List, Tuple
-
-# ── palette ────────────────────────────────────────────────────────────────
-hex2rgb = lambda h: [int(h[i:i+2], 16) / 255 for i in (0, 2, 4)]
-YELLOW  = hex2rgb("FFED99")
-PASTELS = list(map(hex2rgb, ("FFCCD8", "C3F0A9", "AFF5FF", "FFC69A", "7AB2FB", "D5B0F7", "B4B0AF")))
-next_pastel = itertools.cycle(PASTELS)
+import sys
 
-# ── patterns & layout ───────────────────────────────────────────────────────
-SEC_RE  = re.compile(r"Client Adjusted Charges Summary", re.I)
-CRL_RE  = re.compile(r"^CRL\w+", re.I)
-ROW_RE  = re.compile(r"^\d+\s+\d{2}/\d{2}/\d{4}\s+[A-Z]{2,5}\b")
-DATE_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
-INIT_RE = re.compile(r"^[A-Z]{2,5}$")
-ROW_TOL, HEADER_LEFT = 2.0, 150     # spacing heuristics
-
-# ── helpers ────────────────────────────────────────────────────────────────
-def group_rows(words, tol=ROW_TOL):
-    """Yield lists of words that share the same baseline (≈ same y-coord)."""
-    words = sorted(words, key=lambda w: (w["top"], w["x0"]))
-    buf, top = [], None
-    for w in words:
-        if top is None or abs(w["top"] - top) <= tol:
-            buf.append(w); top = w["top"] if top is None else top
-        else:
-            yield sorted(buf, key=lambda x: x["x0"]); buf, top = [w], w["top"]
-    if buf:
-        yield sorted(buf, key=lambda x: x["x0"])
+import layout
+from profiles import PROFILES
 
-def bbox(ws, pad=0.3):
-    """Tight-ish bounding box around a list of pdfplumber word dicts."""
-    return fitz.Rect(
-        min(w["x0"] for w in ws) - pad,
-        min(w["top"] for w in ws) - pad,
-        max(w["x1"] for w in ws) + pad,
-        max(w["bottom"] for w in ws) + pad,
-    )
+PROFILE = PROFILES["CounselLink"]
+VERSION = PROFILE.version       # bump with the rev letter; cached results are keyed on it
 
-def paint(page: fitz.Page, rect: fitz.Rect,
-          colour: Tuple[float, float, float], alpha: float = 0.95):
+def highlight(src="input.pdf", dst="output.pdf", **kwargs):
     """
-    Add a real Highlight annotation (no outline, Multiply blend).
-    
-    colour → use as “stroke” because that’s the channel Highlight annots respect.
-    """
-    annot = page.add_highlight_annot(rect)
-    annot.set_colors(stroke=colour)   # sets the highlight colour
-    annot.set_opacity(alpha)          # make it pop (adjust as you like)
-    annot.update()
-
-# ── main routine ───────────────────────────────────────────────────────────
-def highlight(src="input.pdf", dst="output.pdf"):
-    pastel_of: Dict[str, Tuple[float, float, float]] = {}
-    with pdfplumber.open(src) as pl_doc, fitz.open(src) as mu_doc:
-        in_sec = in_hdr = False
-        for pl_pg, mu_pg in zip(pl_doc.pages, mu_doc):
-            for row in group_rows(pl_pg.extract_words()):
-                text = " ".join(w["text"] for w in row).strip()
+    Highlight `src` into `dst`; returns the (marks, pastel_of) plan for reuse.
 
-                # enter section
-                if not in_sec:
-                    in_sec = bool(SEC_RE.search(text))
-                    continue
-
-                # ── CRL header (yellow) ───────────────────────────────
-                if CRL_RE.match(text): in_hdr = True
-                if in_hdr and not ROW_RE.match(text):
-                    if row[0]["x0"] < HEADER_LEFT:
-                        paint(mu_pg, bbox(row), YELLOW)
-                    continue
-                if in_hdr and ROW_RE.match(text): in_hdr = False
-
-                # ── body rows (date + initials, same pastel) ──────────
-                if ROW_RE.match(text):
-                    date_w = next((w for w in row if DATE_RE.fullmatch(w["text"])), None)
-                    init_w = next((w for w in row
-                                   if date_w and w["x0"] > date_w["x1"]
-                                   and INIT_RE.fullmatch(w["text"])), None)
-                    if not (date_w and init_w):
-                        continue
-
-                    col = pastel_of.setdefault(init_w["text"], next(next_pastel))
-                    paint(mu_pg, bbox([date_w]), col)
-                    paint(mu_pg, bbox([init_w]), col)
-
-        mu_doc.save(dst, garbage=4, deflate=True)
+    `src` may be a path or PDF bytes, `dst` a path or a writable binary buffer.
+    Keyword arguments are those of `layout.highlight`.
+    """
+    return layout.highlight(PROFILE, src, dst, **kwargs)
 
 # ── wrapper function for API integration ───────────────────────────────────
-def highlight_counsellink_invoice(input_path: str, output_path: str, title: str = None):
+def highlight_counsellink_invoice(input_path: str, output_path: str, title: str = None,
+                                  engine: str = None, workers: int = None, plan=None,
+                                  save_mode: str = None, progress=None, annot_mode: str = None,
+                                  pages: str = None):
     """
     Wrapper function that matches the T360 interface for API integration.
     
     Args:
-        input_path: Path to input PDF file
-        output_path: Path to output highlighted PDF file
+        input_path: Path to input PDF file, or the PDF bytes
+        output_path: Path to output highlighted PDF file, or a writable binary buffer
         title: Optional title parameter (not used by CounselLink highlighter but kept for interface compatibility)
+        engine: Word-extraction engine name (see extract.py); defaults to PyMuPDF
+        workers: Extraction processes (see extract.iter_page_rows); defaults to HIGHLIGHT_WORKERS
+        plan: (marks, pastel_of) returned by an earlier call on the same input; skips extraction
+        save_mode: "compact" (default), "fast" or "incremental" (see output.py)
+        progress: Optional callback(key, count) for page / line-item / annotation counts
+        annot_mode: "rect" (default) or "keeper", one multi-quad highlight per keeper and page (see annotate.py)
+        pages: Optional page range, e.g. "120-180"; only those pages are read and written (see extract.py)
+
+    Returns:
+        The (marks, pastel_of) plan, suitable for caching (see cache.py)
     """
-    highlight(input_path, output_path)
+    return highlight(input_path, output_path, engine=engine, workers=workers, plan=plan,
+                     save_mode=save_mode, progress=progress, annot_mode=annot_mode, pages=pages)
 
 # ── CLI ─────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    if len(sys.argv) == 1:
+    args = sys.argv[1:]
+    if args[:1] == ["--summary"] and len(args) in (3, 4):
+        # keepers, colours, CRL headers and initials only; no PDF (see summary.py)
+        import summary
+        text = summary.render(summary.summarize(PROFILE, args[2]), args[1])
+        if len(args) == 4:
+            with open(args[3], "w") as fh:
+                fh.write(text)
+        else:
+            sys.stdout.write(text)
+    elif len(args) == 0:
         highlight()                       # input.pdf → output.pdf
-    elif len(sys.argv) == 3:
-        highlight(sys.argv[1], sys.argv[2])
+    elif len(args) == 2:
+        highlight(args[0], args[1])
     else:
-        sys.exit("Usage:  python highlight_counsellink.py [in.pdf out.pdf]")
+        sys.exit("Usage:  python highlight_counsellink.py [in.pdf out.pdf]\n"
+                 "        python highlight_counsellink.py --summary json|csv in.pdf [summary-file]")
@@ -0,0 +1,183 @@
+"""
+instrument.py
+
+Lightweight, always-on request instrumentation.
+
+An `Instrument` collects per-stage wall-clock time, counters (pages, words,
+rows, line items, annotations) and peak RSS for one highlight run. It is
+made current with `Instrument.run(fn, ...)`, a context variable, so the
+extraction/parsing/save code only has to call the module-level `stage()`
+and `add()` helpers; they are no-ops when nothing is being measured.
+
+Stage times are exclusive: a stage entered while another is open (e.g.
+lazy extraction pulled from inside the parser) is subtracted from the outer
+one, so the stages add up to the total.
+
+An Instrument is also a `progress(key, count)` callback, so it can be passed
+straight to the highlighters to pick up their page/line-item/annotation counts.
+
+`SamplingProfiler` samples one thread's Python stack at a fixed interval
+and aggregates the stacks in collapsed ("folded") form, readable by
+flamegraph.pl / speedscope.
+"""
+import contextvars
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("instrument", default=None)
+RSS_INTERVAL = 0.05   # seconds between RSS samples; reading /proc per page is not free
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024) if hasattr(os, "sysconf") else None
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (falls back to the process peak off Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, TypeError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Instrument:
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.peak_rss_mb = rss_mb()
+        self.elapsed = 0.0
+        self._open = []       # time spent in nested stages, per open stage
+        self._rss_at = time.perf_counter()
+
+    def _sample_rss(self, now: float, force: bool = False):
+        if force or now - self._rss_at >= RSS_INTERVAL:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+            self._rss_at = now
+
+    # progress(key, count) protocol: counts are cumulative, keep the latest
+    def __call__(self, key: str, count: int):
+        self.counts[key] = count
+
+    def add(self, key: str, n: int):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        self._open.append(0.0)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            spent = now - t0
+            self.stages[name] = self.stages.get(name, 0.0) + spent - self._open.pop()
+            if self._open:
+                self._open[-1] += spent
+            self._sample_rss(now)
+
+    def run(self, fn, *args, **kwargs):
+        """Call `fn` with this instrument current (in this thread / context)."""
+        token = _current.set(self)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            now = time.perf_counter()
+            self.elapsed += now - t0
+            self._sample_rss(now, force=True)
+            _current.reset(token)
+
+    def server_timing(self) -> str:
+        """Value for a Server-Timing response header (durations in ms)."""
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ", ".join(parts)
+
+    def headers(self) -> dict[str, str]:
+        counts = ", ".join(f"{k}={v}" for k, v in self.as_dict()["counts"].items())
+        return {"Server-Timing": self.server_timing(), "X-Highlight-Counts": counts}
+
+    def as_dict(self) -> dict:
+        return {
+            "stages_ms": {name: round(secs * 1000, 1) for name, secs in self.stages.items()},
+            "total_ms": round(self.elapsed * 1000, 1),
+            "counts": {**self.counts, "peak_rss_mb": round(self.peak_rss_mb, 1)},
+        }
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage on the current Instrument, if any."""
+    inst = _current.get()
+    if inst is None:
+        yield
+    else:
+        with inst.stage(name):
+            yield
+
+def add(key: str, n: int):
+    """Increment a counter on the current Instrument, if any."""
+    inst = _current.get()
+    if inst is not None:
+        inst.add(key, n)
+
+
+# ─────────────── Sampling profiler ────────────────────────────
+class SamplingProfiler:
+    """Samples `thread_id`'s stack every `interval` seconds from a background thread."""
+
+    def __init__(self, thread_id: int | None = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+    def top(self, n: int = 25) -> list[dict]:
+        """Functions by self samples (leaf frames) and total samples (anywhere on stack)."""
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return [
+            {"function": fn, "self": self_counts[fn], "total": total_counts[fn],
+             "self_ms": round(self_counts[fn] * self.interval * 1000, 1)}
+            for fn, _ in self_counts.most_common(n)
+        ]
+
+def profile(fn, *args, interval: float = 0.005, **kwargs):
+    """Call `fn` under a SamplingProfiler on this thread; returns (result, profiler)."""
+    with SamplingProfiler(interval=interval) as profiler:
+        result = fn(*args, **kwargs)
+    return result, profiler
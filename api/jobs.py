@@ -0,0 +1,241 @@
+"""
+jobs.py
+
+Background highlight jobs for large invoices.
+
+Jobs run on a local process pool so a 500-page invoice never blocks the
+event loop. The number of accepted-but-unfinished jobs is capped
+(workers + queue size); `submit` raises `QueueFull` beyond that so the API
+can answer 429 instead of piling up work.
+
+Workers report progress (total_pages, pages, line_items, annotations) over a
+multiprocessing queue that a thread in the parent drains into the job table.
+A finished job also carries its per-stage timings (see instrument.py).
+Its output PDF is spilled to a capped, LRU-evicted directory on disk (see
+cache.py) rather than held in memory, so finished jobs cost the API
+process almost nothing however large their invoices; a result evicted
+before it is fetched is reported as gone.
+With HIGHLIGHT_POOL=1 jobs run on the warm worker pool instead (see
+workers.py), which forwards progress itself and adds per-job timeouts and
+worker recycling.
+State lives in this process only: the job API is meant for self-hosted
+deployments, not for stateless serverless functions.
+
+Configuration (environment):
+    HIGHLIGHT_JOB_WORKERS  – concurrent jobs (default 2)
+    HIGHLIGHT_JOB_QUEUE    – jobs allowed to wait for a worker (default 8)
+    HIGHLIGHT_JOB_TTL      – seconds a finished job is kept (default 3600)
+    HIGHLIGHT_JOB_RESULTS_MB – disk cap for finished jobs' PDFs (default 1024)
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from batch import highlight_one
+from cache import CACHE_DIR, DiskLRU
+from pools import SPAWN, ProcessPool
+from workers import POOL_ENABLED, PoolFull, get_pool as get_warm_pool
+
+log = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("HIGHLIGHT_JOB_WORKERS", "2"))
+JOB_QUEUE = int(os.environ.get("HIGHLIGHT_JOB_QUEUE", "8"))
+JOB_TTL = int(os.environ.get("HIGHLIGHT_JOB_TTL", "3600"))
+JOB_RESULTS_MB = int(os.environ.get("HIGHLIGHT_JOB_RESULTS_MB", "1024"))
+
+DRAIN_POLL = 0.5    # seconds a drainer waits before checking its queue is still current
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "error"
+
+
+class QueueFull(Exception):
+    """Raised by `JobManager.submit` when no more jobs can be accepted."""
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    platform: str
+    status: str = QUEUED
+    progress: dict = field(default_factory=dict)
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    error: str | None = None
+    timings: dict | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "platform": self.platform,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "timings": self.timings,
+        }
+
+# ─────────────── Worker side ──────────────────────────────────
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def _run_job(job_id, name, data, platform, save_mode, annot_mode, pages):
+    _progress_queue.put((job_id, "status", RUNNING))
+    return highlight_one(name, data, platform, save_mode, annot_mode=annot_mode, pages=pages,
+                         progress=lambda key, count: _progress_queue.put((job_id, key, count)))
+
+def _run_warm_job(name, data, platform, save_mode, annot_mode, pages, progress):
+    progress("status", RUNNING)
+    return highlight_one(name, data, platform, save_mode, annot_mode=annot_mode, pages=pages, progress=progress)
+
+# ─────────────── Manager ──────────────────────────────────────
+class JobManager:
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE, ttl: int = JOB_TTL,
+                 results_mb: int = JOB_RESULTS_MB):
+        self.capacity = workers + max_queue
+        self.ttl = ttl
+        self.jobs: dict[str, Job] = {}
+        self.results = DiskLRU(CACHE_DIR / "jobs", results_mb * 1024 * 1024, suffix=".pdf")
+        self._lock = threading.Lock()
+        self._warm = get_warm_pool() if POOL_ENABLED else None
+        if self._warm is not None:
+            self._pool = self._progress = self._drainer = None
+            return
+        self._progress = self._drainer = None
+        self._pool = ProcessPool("job", workers, initializer=_init_worker,
+                                 make_initargs=self._new_progress_queue)
+
+    def active(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status in (QUEUED, RUNNING))
+
+    def submit(self, data: bytes, filename: str, platform: str, save_mode: str,
+               annot_mode: str | None = None, pages: str | None = None) -> Job:
+        with self._lock:
+            self._expire()
+            if self.active() >= self.capacity:
+                raise QueueFull(f"{self.capacity} jobs already queued or running")
+            job = Job(id=uuid.uuid4().hex, filename=filename, platform=platform)
+            self.jobs[job.id] = job
+        if self._warm is not None:
+            try:
+                future = self._warm.submit(_run_warm_job, filename, data, platform, save_mode, annot_mode, pages,
+                                           progress=lambda key, value: self._update(job.id, key, value))
+            except PoolFull as e:
+                self._forget(job)
+                raise QueueFull(str(e)) from e
+        else:
+            try:
+                future = self._pool.submit(_run_job, job.id, filename, data, platform, save_mode, annot_mode, pages)
+            except BaseException:
+                self._forget(job)  # never started, so it must not hold a place in the queue
+                raise
+        future.add_done_callback(lambda f: self._finish(job, f))
+        log.info(f"Queued job {job.id} for {filename} ({platform})")
+        return job
+
+    def _forget(self, job: Job):
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._expire()
+            return self.jobs.get(job_id)
+
+    def result(self, job: Job) -> Path | None:
+        """The finished job's PDF on disk, or None once it has been evicted."""
+        return self.results.get(job.id)
+
+    def _finish(self, job: Job, future):
+        try:
+            job.platform, pdf, job.timings = future.result()
+            self.results.put_bytes(job.id, pdf)
+            job.status = DONE
+        except Exception as e:
+            log.warning(f"Job {job.id} failed: {e}")
+            job.status, job.error = FAILED, str(e) or type(e).__name__
+        job.finished = time.time()
+        job.started = job.started or job.finished
+        log.info(f"Job {job.id} finished with status {job.status}")
+
+    def _new_progress_queue(self) -> tuple:
+        """
+        A fresh progress queue, with its own drainer thread, for a (re)started
+        pool. A worker killed mid-put can leave the old queue's lock held
+        forever, so a replaced queue is never used again.
+        """
+        self._progress = SPAWN.Queue()
+        self._progress.cancel_join_thread()  # never block exit on a dead queue
+        self._drainer = threading.Thread(target=self._drain, args=(self._progress,), name="job-progress",
+                                         daemon=True)
+        self._drainer.start()
+        return (self._progress,)
+
+    def _drain(self, progress):
+        # ends once the queue is replaced or the manager shuts down
+        while progress is self._progress:
+            try:
+                msg = progress.get(timeout=DRAIN_POLL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError, ValueError):
+                return  # queue closed
+            self._update(*msg)
+
+    def _update(self, job_id, key, value):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if key == "status":
+            if job.status == QUEUED:
+                job.status, job.started = value, time.time()
+        else:
+            job.progress[key] = value
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished < cutoff]:
+            del self.jobs[job_id]
+            self.results.path_for(job_id).unlink(missing_ok=True)
+
+    def shutdown(self):
+        # job state dies with this process, so its results can go too
+        for job_id in list(self.jobs):
+            self.results.path_for(job_id).unlink(missing_ok=True)
+        if self._warm is not None:
+            return  # the warm pool is shut down with the app (see workers.py)
+        self._pool.shutdown(wait=False)
+        drainer, self._progress = self._drainer, None
+        if drainer is not None:
+            drainer.join(timeout=5)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> JobManager:
+    """The process-wide JobManager, created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+def shutdown_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+        _manager = None
@@ -0,0 +1,129 @@
+"""
+keepers.py
+
+Shared keeper colour registry.
+
+Every keeper a profile with colours.scope "registry" (see profiles.py) has
+ever highlighted is registered once, under its normalised colour key (see
+layout.keeper_key), and given the next ordinal for that platform. Its colour
+is palette[ordinal % len(palette)] from then on, whichever invoice, request,
+batch worker or process it turns up in, so one keeper is always one colour.
+Ordinals are handed out round-robin, so the first keepers a platform sees
+get distinct colours.
+
+Assignments live in a small SQLite database shared by every process on the
+machine; ordinals are allocated inside a write transaction, so concurrent
+workers never hand one out twice. Each process keeps an in-memory LRU in
+front of it: assignments never change, so a cached one is never stale, and
+a warm keeper costs a dict lookup. The registry is opened lazily, per
+process (a forked worker reopens it).
+
+Configuration (environment):
+    HIGHLIGHT_KEEPER_DB   – database path (default: <cache dir>/keepers.sqlite);
+                            ":memory:" keeps the registry per process
+    HIGHLIGHT_KEEPER_LRU  – keepers cached in memory per process (default 4096)
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from cache import CACHE_DIR, cache_dir_ok
+
+log = logging.getLogger(__name__)
+
+KEEPER_DB = os.environ.get("HIGHLIGHT_KEEPER_DB", str(CACHE_DIR / "keepers.sqlite"))
+KEEPER_LRU = int(os.environ.get("HIGHLIGHT_KEEPER_LRU", "4096"))
+MEMORY = ":memory:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keepers (
+    namespace TEXT NOT NULL,
+    key       TEXT NOT NULL,
+    ordinal   INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class KeeperRegistry:
+    """Permanent (namespace, key) → ordinal assignments, with an LRU in front."""
+
+    def __init__(self, path: str = KEEPER_DB, lru_size: int = KEEPER_LRU):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connect(self):
+        # a connection inherited over fork() must not be used; open our own
+        if self._db is None or self._pid != os.getpid():
+            import sqlite3  # deferred so importing the layout engine stays cheap
+            try:
+                if self.path != MEMORY:
+                    if os.path.dirname(self.path) == str(CACHE_DIR) and not cache_dir_ok():
+                        raise OSError(f"{CACHE_DIR} is not private to this user")
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+                db.execute(SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Keeper registry {self.path} unavailable ({e}); keeping it in memory")
+                self.path = MEMORY
+                db = sqlite3.connect(MEMORY, isolation_level=None, check_same_thread=False)
+                db.execute(SCHEMA)
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def ordinal(self, namespace: str, key: str) -> int:
+        """The ordinal of `key` in `namespace`, registering it on first sight."""
+        item = (namespace, key)
+        with self._lock:
+            ordinal = self._lru.get(item)
+            if ordinal is not None:
+                self._lru.move_to_end(item)
+                return ordinal
+            ordinal = self._lookup(namespace, key)
+            self._lru[item] = ordinal
+            if len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+            return ordinal
+
+    def _lookup(self, namespace: str, key: str) -> int:
+        db = self._connect()
+        row = db.execute("SELECT ordinal FROM keepers WHERE namespace = ? AND key = ?",
+                         (namespace, key)).fetchone()
+        if row is not None:
+            return row[0]
+        # IMMEDIATE takes the write lock up front, so the count and the insert
+        # see the same table in every process
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT OR IGNORE INTO keepers (namespace, key, ordinal) "
+                       "SELECT ?, ?, COUNT(*) FROM keepers WHERE namespace = ?",
+                       (namespace, key, namespace))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return db.execute("SELECT ordinal FROM keepers WHERE namespace = ? AND key = ?",
+                          (namespace, key)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> KeeperRegistry:
+    """The process-wide keeper registry, created on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = KeeperRegistry()
+        return _registry
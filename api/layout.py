@@ -0,0 +1,372 @@
+"""
+layout.py
+
+The shared highlighting engine: runs a compiled layout profile (see
+profiles.py) over the rows of the common extraction engine (extract.py)
+and writes the highlights with annotate.py.
+
+Every platform gets the same single pass: pages are extracted, grouped into
+rows and classified as they stream through `plan_marks`, and each page's
+highlights are written as soon as no later row can add to it, so memory
+stays flat however long the invoice is.
+
+A plan is (marks, keeper_colours), marks = [(page index, (x0, y0, x1, y1),
+colour), …] in paint order. It is everything `paint_marks` needs, so it can
+be cached and replayed without re-reading the PDF text (see cache.py).
+"""
+import itertools
+from functools import partial
+from operator import itemgetter
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+import instrument
+import keepers
+from annotate import AnnotationWriter
+from extract import iter_page_rows, open_document, page_span
+from output import save_document
+from profiles import Profile
+
+Rect = tuple[float, float, float, float]
+Colour = tuple[float, float, float]
+Mark = tuple[int, Rect, Colour]
+
+by_top, by_x0 = itemgetter("top", "x0"), itemgetter("x0")
+
+
+# ─────────────── Rows & boxes ─────────────────────────────────
+def group_rows(words, tolerance: float = 2.0, order: str = "top") -> list[list[dict]]:
+    """Rows from one page's word dicts (see extract.py), anchored on each row's first word."""
+    rows, top = [], None
+    for w in sorted(words, key=by_top):
+        if top is None or abs(w["top"] - top) > tolerance:
+            rows.append([w])
+            top = w["top"]
+        else:
+            rows[-1].append(w)
+    if order == "x0":
+        for row in rows:
+            row.sort(key=by_x0)
+    return rows
+
+def row_builder(profile: Profile):
+    """`group_rows` bound to the profile's layout; picklable for extraction workers."""
+    return partial(group_rows, tolerance=profile.row_tolerance, order=profile.row_order)
+
+def bbox(words, pad: float = 0.0) -> Rect:
+    """(x0, y0, x1, y1) around `words`, grown by `pad`, in one pass."""
+    w = words[0]
+    x0, y0, x1, y1 = w["x0"], w["top"], w["x1"], w["bottom"]
+    for w in words[1:]:
+        if w["x0"] < x0: x0 = w["x0"]
+        if w["top"] < y0: y0 = w["top"]
+        if w["x1"] > x1: x1 = w["x1"]
+        if w["bottom"] > y1: y1 = w["bottom"]
+    return (x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+
+def find_section_start(doc, profile: Profile, stop: int | None = None) -> int | None:
+    """
+    Index of the first page (before `stop`) that can hold the section's start row, or None.
+
+    Uses the plain page text, which is much cheaper than word extraction and
+    row grouping: a page whose text lacks one of the profile's section words
+    cannot start the section and is skipped.
+    """
+    for pno in range(doc.page_count if stop is None else stop):
+        text = doc[pno].get_text().lower()
+        if all(word in text for word in profile.section_words):
+            return pno
+    return None
+
+# ─────────────── Line items ───────────────────────────────────
+class _Item:
+    """An open line item: its first rows (for the keeper) and its block, one bbox per page."""
+    __slots__ = ("rows", "page", "blocks")
+
+    def __init__(self, row, pno):
+        self.rows = [row]
+        self.page = pno
+        self.blocks: dict[int, Rect] = {}
+
+    def add_block_row(self, row, pno, pad):
+        box = bbox(row, pad)
+        if pno in self.blocks:
+            x0, y0, x1, y1 = self.blocks[pno]
+            box = (min(x0, box[0]), min(y0, box[1]), max(x1, box[2]), max(y1, box[3]))
+        self.blocks[pno] = box
+
+def keeper_words(profile: Profile, item: _Item):
+    """(keeper words, anchor word or None) for `item`, per the profile's keeper rule."""
+    row = item.rows[0]
+    texts = [w["text"] for w in row]
+    anchor = next((i for i, t in enumerate(texts) if profile.anchor.fullmatch(t)), None)
+
+    if profile.word is not None:
+        if anchor is None:
+            return [], None
+        a = row[anchor]
+        key = next((w for w in row if w["x0"] > a["x1"] and profile.word.fullmatch(w["text"])), None)
+        return ([key] if key else []), a
+
+    end = None if anchor is None else next(
+        (i for i in range(anchor + 1, len(row)) if profile.until.fullmatch(texts[i])), None)
+    if end is None:
+        return row, None                   # fall back to the whole first row
+    words = row[anchor + 1:end]
+    if words:
+        # the name may wrap onto the next rows, starting at the same x0
+        base_x0 = min(w["x0"] for w in words)
+        for cont in item.rows[1:]:
+            if cont[0]["page_number"] != row[0]["page_number"]:
+                break
+            cont_words = [w for w in cont if abs(w["x0"] - base_x0) < profile.x_tolerance]
+            if not cont_words:
+                break
+            words.extend(cont_words)
+    return words, row[anchor]
+
+def keeper_key(profile: Profile, words) -> str:
+    texts = (w["text"] for w in words)
+    if profile.key_strip:
+        texts = (t.strip(profile.key_strip) for t in texts)
+    key = " ".join(texts)
+    return key.lower() if profile.key_lower else key
+
+def colour_picker(profile: Profile) -> Callable[[str], Colour]:
+    """
+    `pick(key)` → the colour of a keeper first seen in this document: the
+    next palette colour ("document" scope), or its colour in the shared
+    keeper registry ("registry" scope, see keepers.py).
+    """
+    palette = profile.palette
+    if profile.colour_scope == "document":
+        cycle = itertools.cycle(palette)
+        return lambda key: next(cycle)
+    registry = keepers.get_registry()
+    return lambda key: palette[registry.ordinal(profile.name, key) % len(palette)]
+
+def item_marks(profile: Profile, item: _Item, colours: dict, pick: Callable[[str], Colour]) -> list[Mark]:
+    """The keeper (and anchor) rectangles and per-page block rectangles for one item, in paint order."""
+    if profile.block_required and not item.blocks:
+        return []
+    words, anchor = keeper_words(profile, item)
+    if not words:
+        return []
+    key = keeper_key(profile, words)
+    colour = colours.get(key)
+    if colour is None:
+        colour = colours[key] = pick(key)
+
+    pad = profile.pad
+    marks = []
+    if profile.mark_anchor and anchor is not None:
+        marks.append((anchor["page_number"] - 1, bbox([anchor], pad), colour))
+    marks.append((words[0]["page_number"] - 1, bbox(words, pad), colour))
+    marks.extend((pno, item.blocks[pno], colour) for pno in sorted(item.blocks))
+    return marks
+
+def item_record(profile: Profile, item: _Item, index: int, colour: Colour) -> dict:
+    """
+    A highlighted item as plain data for summaries (see summary.py): its
+    keeper text and colour key, anchor (e.g. the date), the keeper's page
+    and box, and its block box per page. Pages are 1-based here.
+    """
+    words, anchor = keeper_words(profile, item)
+    return {
+        "kind": "line_item",
+        "index": index,
+        "keeper": " ".join(w["text"] for w in words),
+        "key": keeper_key(profile, words),
+        "colour": colour,
+        "anchor": anchor["text"] if anchor is not None else None,
+        "page": words[0]["page_number"],
+        "keeper_bbox": bbox(words, profile.pad),
+        "blocks": [{"page": pno + 1, "bbox": item.blocks[pno]} for pno in sorted(item.blocks)],
+    }
+
+# ─────────────── Planning ─────────────────────────────────────
+def plan_marks(profile: Profile, page_rows, progress: Callable[[str, int], None] | None = None,
+               on_marks: Callable[[list[Mark], int | None], None] | None = None, start: int = 0,
+               on_item: Callable[[dict], None] | None = None, section_open: bool = False):
+    """
+    Runs the profile's section / header / line-item / block state machine over
+    grouped rows, page by page (`page_rows` begins at page index `start`), and
+    returns the (marks, keeper_colours) plan. `section_open` means the
+    section started on an earlier page.
+
+    After each page, `on_marks(new_marks, settled)` receives the marks found
+    since the last call; pages below `settled` will get no more marks (None
+    once the rows run out). `progress(key, count)` gets "pages" and "line_items".
+    `on_item(record)` receives each highlighted item (see `item_record`) and
+    header row, in document order.
+    """
+    progress = progress or (lambda key, count: None)
+    marks: list[Mark] = []
+    colours: dict[str, Colour] = {}
+    pick = colour_picker(profile)
+    pad, header_colour = profile.pad, profile.header_colour
+    context_rows, complete_at_start = profile.context_rows, profile.complete_at_start
+    in_section = section_open or profile.section is None
+    in_header = in_block = False
+    item, n_items, sent = None, 0, 0
+
+    def close(item):
+        nonlocal n_items
+        new = item_marks(profile, item, colours, pick)
+        if new:
+            n_items += 1
+            marks.extend(new)
+            if on_item:
+                on_item(item_record(profile, item, n_items, new[-1][2]))
+
+    for pno, rows in enumerate(page_rows, start):
+        for row in rows:
+            text = " ".join([w["text"] for w in row])
+            if not in_section:
+                in_section = profile.section.search(text) is not None
+                continue
+
+            # classify the row once
+            kind = profile.classify(text)
+            if kind == "record":
+                if item is not None:
+                    close(item)
+                item = _Item(row, pno)
+                in_header = in_block = False
+                if complete_at_start:
+                    close(item)
+                    item = None
+                continue
+
+            if kind == "header":
+                in_header = True
+            if in_header:
+                if row[0]["x0"] < profile.header_max_x0:
+                    box = bbox(row, pad)
+                    marks.append((pno, box, header_colour))
+                    if on_item:
+                        on_item({"kind": "header", "page": pno + 1, "bbox": box,
+                                 "colour": header_colour, "text": text})
+                continue
+
+            if item is None:
+                continue
+            if not in_block and len(item.rows) < context_rows:
+                item.rows.append(row)
+            if kind == "block":
+                in_block = True
+            elif in_block:
+                item.add_block_row(row, pno, pad)
+
+        progress("pages", pno + 1)
+        progress("line_items", n_items)
+        if on_marks:
+            # an open item still adds marks from its first page on
+            on_marks(marks[sent:], item.page if item is not None else pno + 1)
+            sent = len(marks)
+
+    if item is not None:
+        close(item)
+        progress("line_items", n_items)
+    if on_marks:
+        on_marks(marks[sent:], None)
+    return marks, colours
+
+def plan_highlights(profile: Profile, doc, engine: str | None = None, workers: int | None = None,
+                    progress: Callable[[str, int], None] | None = None,
+                    on_marks: Callable[[list[Mark], int | None], None] | None = None,
+                    on_item: Callable[[dict], None] | None = None, pages: range | None = None):
+    """
+    Reads `doc` page by page into the (marks, keeper_colours) plan.
+
+    `progress(key, count)` is called with "total_pages", "pages" and
+    "line_items". Pages before the profile's section are never extracted.
+    `on_marks` and `on_item` are passed on to `plan_marks`. With `pages` (a
+    range of page indices, see extract.page_span) only those pages are read;
+    line items that start before them are not highlighted.
+    """
+    progress = progress or (lambda key, count: None)
+    pages = pages or range(doc.page_count)
+    progress("total_pages", len(pages))
+    start, section_open = pages.start, False
+    if profile.section is not None:
+        # nothing before the section is highlighted, so only extract from there on
+        with instrument.stage("locate"):
+            found = find_section_start(doc, profile, stop=pages.stop)
+        if found is None:
+            progress("pages", len(pages))
+            progress("line_items", 0)
+            if on_marks:
+                on_marks([], None)
+            return [], {}
+        section_open = found < start
+        start = max(start, found)
+
+    if pages.start:
+        # count "pages" from the start of the range, like "total_pages"
+        report = progress
+        progress = lambda key, count: report(key, count - pages.start if key == "pages" else count)
+
+    # rows are extracted lazily (optionally across worker processes) as the
+    # parser pulls them; those stages are subtracted from "parse" (see instrument.py)
+    with instrument.stage("parse"):
+        page_rows = iter_page_rows(doc, row_builder(profile), engine, workers, start=start,
+                                   stop=pages.stop, **profile.extract)
+        return plan_marks(profile, page_rows, progress, on_marks, start=start, on_item=on_item,
+                          section_open=section_open)
+
+# ─────────────── Painting & entry point ───────────────────────
+def paint_marks(profile: Profile, doc, marks: list[Mark],
+                progress: Callable[[str, int], None] | None = None, annot_mode: str | None = None) -> int:
+    """Draws `marks` onto `doc` (see annotate.py); returns the number of annotations added."""
+    with instrument.stage("annotate"):
+        writer = AnnotationWriter(doc, profile.opacity, annot_mode, progress)
+        writer.add(marks)
+        return writer.flush()
+
+def highlight(profile: Profile, inp: str | Path | bytes, out: str | Path | BinaryIO,
+              title: str | None = None, engine: str | None = None, workers: int | None = None,
+              plan=None, save_mode: str | None = None,
+              progress: Callable[[str, int], None] | None = None, annot_mode: str | None = None,
+              pages: str | None = None):
+    """
+    Highlights `inp` into `out` per `profile` and returns the (marks, keeper_colours) plan.
+
+    `inp` may be a path or the PDF bytes, and `out` a path or a writable
+    binary buffer (e.g. BytesIO), so requests can run without temp files.
+
+    Pass a plan returned by an earlier call on the same input to skip text
+    extraction and parsing, e.g. when only the title changes. `save_mode`
+    picks the output size/latency trade-off (see output.py), `annot_mode`
+    one annotation per rectangle or per keeper and page (see annotate.py),
+    and `progress` receives page, line-item and annotation counts as they
+    advance. `title` is only applied by profiles that retitle.
+
+    `pages` ("120-180", "7", "1500-"; see extract.parse_pages) limits the
+    work, and the output, to that page range. A plan passed back in must
+    come from the same range.
+    """
+    with instrument.stage("open"):
+        doc = open_document(inp)
+    with doc:
+        span = page_span(pages, doc.page_count) if pages else None
+        writer = AnnotationWriter(doc, profile.opacity, annot_mode, progress)
+
+        def paint(marks, settled=None):
+            writer.add(marks)
+            with instrument.stage("annotate"):
+                writer.flush(settled)
+
+        if plan is None:
+            # pages are written as soon as the parser has moved past them
+            plan = plan_highlights(profile, doc, engine, workers, progress, on_marks=paint, pages=span)
+        else:
+            paint(plan[0])
+
+        if not profile.retitle:
+            title = None
+        elif title is None and isinstance(out, (str, Path)):
+            # fall back to the output file-stem when writing to a path
+            title = Path(out).stem
+        save_document(doc, out, title=title, save_mode=save_mode, pages=span)
+    return plan
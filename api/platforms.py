@@ -0,0 +1,58 @@
+"""
+platforms.py
+
+Registry of billing-platform highlighters, one per layout profile (see
+profiles.py), all run by the shared engine in layout.py.
+
+The profiles are plain data and cheap to import; the engine and PyMuPDF are
+only imported when a request actually needs a highlighter. If they cannot be
+imported, a fallback is registered in their place: T360 returns the input
+unchanged, any other platform raises NotImplementedError.
+"""
+import importlib
+import logging
+import shutil
+import threading
+from functools import partial
+
+from profiles import PROFILES
+
+log = logging.getLogger(__name__)
+
+# platform name → compiled profile; adding a profile adds a platform
+PLATFORMS = PROFILES
+
+
+def _fallback_t360(input_path, output_path, title=None, **kwargs):
+    log.info("Using fallback highlight_t360 (file copy)")
+    # Simple fallback - just copy the file
+    if isinstance(input_path, (bytes, bytearray, memoryview)):
+        output_path.write(input_path)
+    else:
+        shutil.copy2(input_path, output_path)
+
+def _fallback_unavailable(platform, input_path, output_path, title=None, **kwargs):
+    log.info(f"Using fallback highlighter for {platform}")
+    raise NotImplementedError(f"{platform} highlighting not available")
+
+FALLBACKS = {"T360": _fallback_t360}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def get_highlighter(platform: str):
+    """Return (highlighter, version) for `platform`, importing the engine on first use."""
+    with _lock:
+        if platform not in _loaded:
+            profile = PLATFORMS[platform]
+            try:
+                importlib.import_module("fitz")
+                layout = importlib.import_module("layout")
+                _loaded[platform] = (partial(layout.highlight, profile), profile.version)
+                log.info(f"Loaded the {platform} profile (version {profile.version})")
+            except ImportError as e:
+                log.error(f"Failed to import the highlighting engine for {platform}: {e}")
+                fallback = FALLBACKS.get(platform, partial(_fallback_unavailable, platform))
+                _loaded[platform] = (fallback, "fallback")
+        return _loaded[platform]
@@ -0,0 +1,75 @@
+"""
+pools.py
+
+The process pools behind page-parallel extraction (extract.py), batches
+(batch.py) and background jobs (jobs.py).
+
+A `ProcessPool` is a ProcessPoolExecutor started on first use and shared by
+every request until `shutdown`. Its workers are started with spawn, never
+fork: the API process has threads (the request threadpool, the job-progress
+drainer, the warm pool's slot threads, see workers.py), and a forked child
+can inherit a lock one of them held.
+
+A ProcessPoolExecutor is broken for good once one of its workers dies (e.g.
+OOM-killed on a huge invoice): the work it was running fails, and every
+later submit raises BrokenProcessPool. `submit` then starts a fresh pool,
+rebuilding the initializer's arguments, and tries once more.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+SPAWN = multiprocessing.get_context("spawn")
+
+
+class ProcessPool:
+    """
+    A lazily started spawn-context process pool that replaces itself once broken.
+
+    `initializer` runs in every worker with the arguments `make_initargs()`
+    returns each time the pool is started.
+    """
+
+    def __init__(self, name: str, workers: int, initializer: Callable | None = None,
+                 make_initargs: Callable[[], tuple] | None = None):
+        self.name = name
+        self.workers = workers
+        self.initializer = initializer
+        self.make_initargs = make_initargs or tuple
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> ProcessPoolExecutor:
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=SPAWN,
+                                             initializer=self.initializer, initargs=self.make_initargs())
+        log.info(f"Started the {self.name} pool ({self.workers} processes)")
+        return self._executor
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._lock:
+            executor = self._executor or self._start()
+            try:
+                return executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                log.warning(f"The {self.name} pool is broken (a worker died); starting a new one")
+                executor.shutdown(wait=False, cancel_futures=True)
+                return self._start().submit(fn, *args, **kwargs)
+
+    def resize(self, workers: int) -> None:
+        """Use `workers` processes from the next submit on; running work finishes on the old pool."""
+        with self._lock:
+            if workers != self.workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor, self.workers = None, workers
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
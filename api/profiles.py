@@ -0,0 +1,219 @@
+"""
+profiles.py
+
+Declarative layout profiles, one per billing platform.
+
+A profile is plain data: the patterns, column positions, section markers
+and colour rules that tell the shared engine (layout.py) what to highlight
+on that platform's invoices. Every profile in SPECS is compiled once, at
+import, into a `Profile` in PROFILES; adding a platform means adding a
+spec here, not another extraction loop.
+
+Spec keys ("name", "version", "record" and "keeper" are required):
+
+  name, version – platform name as sent by clients, and the highlighter
+                  version; bump it whenever the spec changes what gets
+                  highlighted or how (cached results are keyed on it).
+  detect        – [(pattern, weight), …] raw-text markers (see detect.py).
+  extract       – pdfplumber extract_words options (see extract.py).
+  rows          – {"tolerance": pt, "order": "top" | "x0"}: a word within
+                  `tolerance` of a row's first word joins the row; rows keep
+                  (top, x0) order or are re-sorted left to right.
+  section       – {"start": pattern, "page_words": […]}: nothing before the
+                  first row in which `start` is found is highlighted. Pages
+                  whose lower-cased text lacks one of `page_words` cannot
+                  hold that row and are never extracted.
+  record        – {"start": pattern}: a row matching this opens a line item.
+  keeper        – finds the item's keeper in its first row, after the first
+                  word fully matching "anchor":
+                    "until": pattern – the words up to the first one fully
+                             matching it (the whole row when the anchor or
+                             this word is missing), plus up to "continuation"
+                             rows below whose words start at the same x0
+                             (± "x_tolerance")
+                    "word": pattern  – the first word right of the anchor
+                             fully matching it; items without one are skipped
+                  "mark_anchor" highlights the anchor word as well, and
+                  "key" {"strip": chars, "lower": bool} normalises the
+                  keeper text into its colour key.
+  block         – {"start": pattern, "required": bool}: the rows after one
+                  matching `start`, up to the next line item, are the item's
+                  block, highlighted with one rectangle per page. With
+                  `required`, items without a block are not highlighted.
+  header        – {"start": pattern, "max_x0": pt, "colour": hex}: rows from
+                  one matching `start` up to the next line item, highlighted
+                  one by one in `colour` when they begin left of `max_x0`.
+  colours       – {"palette": [hex, …], "scope": "registry" | "document"}:
+                  with "registry" (default) a keeper has one colour across
+                  all documents and processes, from the shared keeper
+                  registry (see keepers.py); with "document" keepers take
+                  palette colours in order of first appearance in each
+                  invoice.
+  pad           – pt added around every rectangle.
+  opacity       – highlight opacity (None leaves the viewer default).
+  retitle       – set the output's /Title (see output.py).
+
+Row patterns match at the start of the row text (words joined by single
+spaces); the section pattern may match anywhere in it. The record, header
+and block patterns are compiled into one alternation, tried in that order,
+so each row is classified with a single match; patterns therefore take
+scoped flags, e.g. (?i:…), not global ones.
+"""
+import re
+
+# ─────────────── Platform specs ───────────────────────────────
+T360 = {
+    "name": "T360",
+    "version": "7",
+    "detect": [
+        (r"(?i:\bT360\b|TyMetrix)", 5),
+        (r"Adjustments and Credit", 3),
+        (r"\b[A-Z]\d{3}\b", 1),            # UTBMS task codes, e.g. A104
+    ],
+    "extract": {"x_tolerance": 1, "y_tolerance": 1, "keep_blank_chars": False},
+    "rows": {"tolerance": 2, "order": "top"},
+    "record": {"start": r"\s*\d{1,3}\s+\d{1,2}/\d{1,2}/\d{4}"},
+    "keeper": {
+        "anchor": r"\d{1,2}/\d{1,2}/\d{4}",
+        "until": r"[A-Za-z]\d{3}|Expense",  # task code, e.g. A104
+        "continuation": 4,                  # names wrap onto at most 4 more rows
+        "x_tolerance": 3,
+        "key": {"strip": ".,;:", "lower": True},
+    },
+    "block": {"start": r"Adjustments and Credit", "required": True},
+    "colours": {
+        "palette": ["FCF485", "C5FB72", "38E5FF", "DCAAFF", "FFA97B", "F86464"],
+        "scope": "registry",
+    },
+    "retitle": True,
+}
+
+COUNSELLINK = {
+    "name": "CounselLink",
+    "version": "N",
+    "detect": [
+        (r"(?i:CounselLink)", 5),
+        (r"(?i:Client Adjusted Charges Summary)", 5),
+        (r"\bCRL\w+", 2),
+    ],
+    "rows": {"tolerance": 2.0, "order": "x0"},
+    "section": {
+        "start": r"(?i:Client Adjusted Charges Summary)",
+        "page_words": ["client", "adjusted", "charges", "summary"],
+    },
+    "record": {"start": r"\d+\s+\d{2}/\d{2}/\d{4}\s+[A-Z]{2,5}\b"},
+    "keeper": {"anchor": r"\d{2}/\d{2}/\d{4}", "word": r"[A-Z]{2,5}", "mark_anchor": True},
+    "header": {"start": r"(?i:CRL\w+)", "max_x0": 150, "colour": "FFED99"},
+    "colours": {
+        "palette": ["FFCCD8", "C3F0A9", "AFF5FF", "FFC69A", "7AB2FB", "D5B0F7", "B4B0AF"],
+        "scope": "registry",
+    },
+    "pad": 0.3,
+    "opacity": 0.95,
+}
+
+SPECS = [T360, COUNSELLINK]
+
+# ─────────────── Compilation ──────────────────────────────────
+KEYS = {"name", "version", "detect", "extract", "rows", "section", "record", "keeper",
+        "block", "header", "colours", "pad", "opacity", "retitle"}
+ROW_KINDS = ("record", "header", "block")
+
+Colour = tuple[float, float, float]
+
+
+def hex2rgb(h: str) -> Colour:
+    return tuple(int(h[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+def rgb2hex(rgb: Colour) -> str:
+    return "".join(f"{round(c * 255):02X}" for c in rgb)
+
+
+class Profile:
+    """A compiled spec: patterns compiled, defaults filled in, layout checked."""
+
+    def __init__(self, spec: dict):
+        unknown = set(spec) - KEYS
+        if unknown:
+            raise ValueError(f"Unknown profile keys: {', '.join(sorted(unknown))}")
+        self.name = spec["name"]
+        self.version = spec["version"]
+        self.detect = [(re.compile(rx), weight) for rx, weight in spec.get("detect", [])]
+        self.extract = dict(spec.get("extract", {}))
+
+        rows = spec.get("rows", {})
+        self.row_tolerance = rows.get("tolerance", 2.0)
+        self.row_order = rows.get("order", "top")
+        if self.row_order not in ("top", "x0"):
+            raise ValueError(f"{self.name}: rows.order must be 'top' or 'x0'")
+
+        section = spec.get("section")
+        self.section = re.compile(section["start"]) if section else None
+        self.section_words = tuple(w.lower() for w in section.get("page_words", ())) if section else ()
+
+        keeper = spec["keeper"]
+        if ("until" in keeper) == ("word" in keeper):
+            raise ValueError(f"{self.name}: keeper needs exactly one of 'until' and 'word'")
+        self.anchor = re.compile(keeper["anchor"])
+        self.until = re.compile(keeper["until"]) if "until" in keeper else None
+        self.word = re.compile(keeper["word"]) if "word" in keeper else None
+        self.continuation = keeper.get("continuation", 0) if self.until else 0
+        self.x_tolerance = keeper.get("x_tolerance", 3)
+        self.mark_anchor = keeper.get("mark_anchor", False)
+        key = keeper.get("key", {})
+        self.key_strip = key.get("strip")
+        self.key_lower = key.get("lower", False)
+
+        block = spec.get("block")
+        self.block_required = bool(block and block.get("required"))
+        header = spec.get("header")
+        self.header_max_x0 = header.get("max_x0", float("inf")) if header else None
+        self.header_colour = hex2rgb(header["colour"]) if header else None
+
+        # one alternation classifies a row as record / header / block, in that order
+        patterns = {"record": spec["record"]["start"],
+                    "header": header and header["start"], "block": block and block["start"]}
+        self.row_kinds = [kind for kind in ROW_KINDS if patterns[kind]]
+        self.classifier = re.compile("|".join(f"(?P<{kind}>{patterns[kind]})" for kind in self.row_kinds))
+
+        colours = spec.get("colours", {})
+        self.palette = [hex2rgb(h) for h in colours.get("palette", ["FFFF00"])]
+        self.colour_scope = colours.get("scope", "registry")
+        if self.colour_scope not in ("registry", "document"):
+            raise ValueError(f"{self.name}: colours.scope must be 'registry' or 'document'")
+        self.pad = spec.get("pad", 0.0)
+        self.opacity = spec.get("opacity")
+        self.retitle = spec.get("retitle", False)
+
+    @property
+    def context_rows(self) -> int:
+        """Rows of an item, from its first, that the keeper may span."""
+        return 1 + self.continuation
+
+    @property
+    def complete_at_start(self) -> bool:
+        """True when nothing after an item's first row can change its highlights."""
+        return "block" not in self.row_kinds and self.continuation == 0
+
+    def classify(self, text: str) -> str | None:
+        """Kind of row ("record", "header" or "block") for a row's text, or None."""
+        m = self.classifier.match(text)
+        if m is None:
+            return None
+        for kind in self.row_kinds:
+            if m.group(kind) is not None:
+                return kind
+        return None
+
+    def __repr__(self):
+        return f"Profile({self.name!r}, version={self.version!r})"
+
+
+def compile_profile(spec: dict) -> Profile:
+    try:
+        return Profile(spec)
+    except (KeyError, TypeError, re.error) as e:
+        raise ValueError(f"Invalid profile {spec.get('name', '?')!r}: {e}") from e
+
+
+PROFILES: dict[str, Profile] = {p.name: p for p in map(compile_profile, SPECS)}
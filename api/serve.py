@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+serve.py
+
+Self-hosted serving mode: runs the FastAPI app under uvicorn with the warm
+worker pool enabled (see workers.py), so highlight requests and jobs run in
+long-lived, prewarmed worker processes instead of the API process.
+
+The API itself runs as a single uvicorn process; concurrency comes from the
+pool. Options map to the HIGHLIGHT_POOL_* environment variables and default
+to them.
+
+Usage:
+    python api/serve.py [--host 0.0.0.0] [--port 8000] [--workers 4] [--queue 32]
+                        [--timeout 300] [--max-jobs 200] [--max-rss-mb 1024]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+OPTIONS = {
+    "workers": "HIGHLIGHT_POOL_WORKERS",
+    "queue": "HIGHLIGHT_POOL_QUEUE",
+    "timeout": "HIGHLIGHT_POOL_TIMEOUT",
+    "max_jobs": "HIGHLIGHT_POOL_MAX_JOBS",
+    "max_rss_mb": "HIGHLIGHT_POOL_MAX_RSS_MB",
+}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Serve the highlighter API with a warm worker pool.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    ap.add_argument("--queue", type=int, help="jobs allowed to wait for a worker")
+    ap.add_argument("--timeout", type=float, help="seconds per job, 0 for none")
+    ap.add_argument("--max-jobs", type=int, help="jobs before a worker is replaced, 0 for never")
+    ap.add_argument("--max-rss-mb", type=float, help="worker RSS before it is replaced, 0 for never")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    # workers.py reads its configuration at import, so set it before the app loads
+    os.environ["HIGHLIGHT_POOL"] = "1"
+    for option, var in OPTIONS.items():
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[var] = str(value)
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+    import uvicorn
+    uvicorn.run("highlight:app", host=args.host, port=args.port, log_level=args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
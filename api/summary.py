@@ -0,0 +1,134 @@
+"""
+summary.py
+
+Structured summary of an invoice: which keepers have highlighted line items,
+in which colours, and where their blocks (T360 Adjustments and Credit) and
+header rows (CounselLink CRL headers) are, as JSON or CSV.
+
+It runs the same extraction and parsing as the highlighters (layout.py) but
+skips annotation and saving, so it is much cheaper than producing the PDF.
+Colours are the ones the highlighted PDF uses for the same document (for
+registry-scoped profiles, the keeper's colour everywhere; see keepers.py).
+
+JSON layout:
+    {"platform", "version", "file", "pages", "page_range",
+     "keepers":    [{"keeper", "key", "colour", "line_items", "pages", "block_pages"}, …],
+     "line_items": [{"index", "keeper", "key", "colour", "anchor", "page",
+                     "keeper_bbox", "blocks": [{"page", "bbox"}, …]}, …],
+     "headers":    [{"page", "bbox", "colour", "text"}, …]}
+
+Pages are 1-based, boxes are [x0, y0, x1, y1] in PDF points from the top-left
+of the page, and colours are "RRGGBB" hex. CSV has one row per keeper box,
+block box and header row (see CSV_FIELDS).
+"""
+import csv
+import io
+import json
+from pathlib import Path
+from typing import Callable
+
+import instrument
+from profiles import Profile, rgb2hex
+
+FORMATS = ("json", "csv")
+CSV_FIELDS = ["kind", "item", "keeper", "anchor", "colour", "page", "x0", "y0", "x1", "y1", "text"]
+
+
+def _box(rect) -> list[float]:
+    return [round(v, 2) for v in rect]
+
+
+def _add_page(pages: list[int], page: int):
+    # items arrive in page order, so a page can only repeat at the end
+    if not pages or pages[-1] != page:
+        pages.append(page)
+
+
+def summarize(profile: Profile, inp: str | Path | bytes, title: str | None = None,
+              engine: str | None = None, workers: int | None = None,
+              progress: Callable[[str, int], None] | None = None, pages: str | None = None) -> dict:
+    """
+    Parses `inp` (a path or the PDF bytes) with `profile` and returns its
+    summary (see the module docstring). `engine`, `workers`, `progress` and
+    `pages` are those of `layout.highlight`; `title` is reported as "file".
+    """
+    import layout
+    from extract import open_document, page_span
+
+    items, headers = [], []
+
+    def collect(record):
+        if record["kind"] == "header":
+            headers.append({"page": record["page"], "bbox": _box(record["bbox"]),
+                            "colour": rgb2hex(record["colour"]), "text": record["text"]})
+        else:
+            items.append({
+                "index": record["index"],
+                "keeper": record["keeper"],
+                "key": record["key"],
+                "colour": rgb2hex(record["colour"]),
+                "anchor": record["anchor"],
+                "page": record["page"],
+                "keeper_bbox": _box(record["keeper_bbox"]),
+                "blocks": [{"page": b["page"], "bbox": _box(b["bbox"])} for b in record["blocks"]],
+            })
+
+    with instrument.stage("open"):
+        doc = open_document(inp)
+    with doc:
+        span = page_span(pages, doc.page_count) if pages else range(doc.page_count)
+        layout.plan_highlights(profile, doc, engine, workers, progress, on_item=collect, pages=span)
+
+    keepers: dict[str, dict] = {}
+    for item in items:
+        keeper = keepers.get(item["key"])
+        if keeper is None:
+            keeper = keepers[item["key"]] = {"keeper": item["keeper"], "key": item["key"],
+                                             "colour": item["colour"], "line_items": 0,
+                                             "pages": [], "block_pages": []}
+        keeper["line_items"] += 1
+        _add_page(keeper["pages"], item["page"])
+        for block in item["blocks"]:
+            _add_page(keeper["block_pages"], block["page"])
+
+    if title is None and isinstance(inp, (str, Path)):
+        title = Path(inp).name
+    return {
+        "platform": profile.name,
+        "version": profile.version,
+        "file": title,
+        "pages": len(span),
+        "page_range": pages,
+        "keepers": list(keepers.values()),
+        "line_items": items,
+        "headers": headers,
+    }
+
+
+def to_csv(summary: dict) -> str:
+    """The summary as CSV text: one row per keeper box, block box and header row."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for item in summary["line_items"]:
+        row = {"item": item["index"], "keeper": item["keeper"], "anchor": item["anchor"],
+               "colour": item["colour"]}
+        writer.writerow({**row, "kind": "keeper", "page": item["page"],
+                         **dict(zip(("x0", "y0", "x1", "y1"), item["keeper_bbox"]))})
+        for block in item["blocks"]:
+            writer.writerow({**row, "kind": "block", "page": block["page"],
+                             **dict(zip(("x0", "y0", "x1", "y1"), block["bbox"]))})
+    for header in summary["headers"]:
+        writer.writerow({"kind": "header", "colour": header["colour"], "page": header["page"],
+                         "text": header["text"],
+                         **dict(zip(("x0", "y0", "x1", "y1"), header["bbox"]))})
+    return buf.getvalue()
+
+
+def render(summary: dict, fmt: str) -> str:
+    """The summary serialised as `fmt` ("json" or "csv")."""
+    if fmt == "csv":
+        return to_csv(summary)
+    if fmt == "json":
+        return json.dumps(summary, indent=2)
+    raise ValueError(f"Unknown summary format: {fmt!r} (choose from {', '.join(FORMATS)})")
@@ -0,0 +1,380 @@
+"""
+workers.py
+
+Warm worker pool for self-hosted deployments (see serve.py).
+
+Each worker is a long-lived process that imports PyMuPDF, pdfplumber and the
+compiled layout profiles, and highlights a one-page PDF, before it takes its
+first job, so requests never pay for cold library state. The pool
+
+  • runs up to HIGHLIGHT_POOL_WORKERS jobs at once and accepts up to
+    HIGHLIGHT_POOL_QUEUE more; `submit` raises `PoolFull` beyond that;
+  • kills a worker whose job runs longer than HIGHLIGHT_POOL_TIMEOUT seconds
+    and fails that job with `JobTimeout`;
+  • replaces a worker after HIGHLIGHT_POOL_MAX_JOBS jobs, or once its RSS
+    passes HIGHLIGHT_POOL_MAX_RSS_MB, to contain PyMuPDF's memory growth;
+  • reports utilisation, queue depth and recycling counts from `stats()`.
+
+Each worker slot is driven by a thread in the API process that hands it one
+job at a time over a pipe. A job is a module-level function plus picklable
+arguments; if `submit` is given a `progress` callback, the function gets a
+`progress(key, count)` keyword whose calls are forwarded to it.
+
+Configuration (environment):
+    HIGHLIGHT_POOL             – "1" routes /python-api/highlight and jobs
+                                 through the pool (default off)
+    HIGHLIGHT_POOL_WORKERS     – worker processes (default: CPU count)
+    HIGHLIGHT_POOL_QUEUE       – jobs allowed to wait for a worker (default 32)
+    HIGHLIGHT_POOL_TIMEOUT     – seconds per job, 0 for none (default 300)
+    HIGHLIGHT_POOL_MAX_JOBS    – jobs before a worker is replaced, 0 for never (default 200)
+    HIGHLIGHT_POOL_MAX_RSS_MB  – RSS before a worker is replaced, 0 for never (default 1024)
+"""
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+from instrument import rss_mb
+
+log = logging.getLogger(__name__)
+
+POOL_ENABLED = os.environ.get("HIGHLIGHT_POOL", "") == "1"
+POOL_WORKERS = int(os.environ.get("HIGHLIGHT_POOL_WORKERS", str(os.cpu_count() or 1)))
+POOL_QUEUE = int(os.environ.get("HIGHLIGHT_POOL_QUEUE", "32"))
+POOL_TIMEOUT = float(os.environ.get("HIGHLIGHT_POOL_TIMEOUT", "300"))
+POOL_MAX_JOBS = int(os.environ.get("HIGHLIGHT_POOL_MAX_JOBS", "200"))
+POOL_MAX_RSS_MB = float(os.environ.get("HIGHLIGHT_POOL_MAX_RSS_MB", "1024"))
+READY_TIMEOUT = 60      # seconds a new worker gets to warm up
+
+
+class PoolFull(Exception):
+    """Raised by `WorkerPool.submit` when every worker is busy and the queue is full."""
+
+class JobTimeout(Exception):
+    """A job ran past the pool's timeout; its worker was killed."""
+
+class WorkerCrashed(Exception):
+    """The worker process died while running a job."""
+
+
+# ─────────────── Worker side ──────────────────────────────────
+def warm_up():
+    """Import the PDF libraries and the profiles, and run one tiny highlight."""
+    import fitz
+    from platforms import PLATFORMS, get_highlighter
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "1 01/02/2024 Doe, Jane A101 Warm-up 0.1 10.00")
+    data = doc.tobytes()
+    doc.close()
+    try:
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            pdf.pages[0].extract_words()
+    except ImportError:
+        pass  # optional engine (see extract.py)
+    for platform in PLATFORMS:
+        highlighter, _version = get_highlighter(platform)
+        highlighter(data, io.BytesIO(), title="warm-up")
+
+def _worker_main(conn):
+    try:
+        warm_up()
+    except Exception as e:
+        # a cold worker still works; the first job just pays for the imports
+        log.warning(f"Worker {os.getpid()} warm-up failed: {e}")
+    conn.send(("ready", os.getpid(), rss_mb()))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        fn, args, kwargs, wants_progress = msg
+        if wants_progress:
+            kwargs["progress"] = lambda key, count: conn.send(("progress", key, count))
+        try:
+            reply = ("done", fn(*args, **kwargs))
+        except Exception as e:
+            log.debug(traceback.format_exc())
+            reply = ("error", e)
+        try:
+            conn.send((*reply, rss_mb()))
+        except Exception as e:
+            # result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), rss_mb()))
+
+def highlight_job(platform, data, title, plan=None, save_mode=None, annot_mode=None, pages=None):
+    """Worker: the /python-api/highlight work for one upload; returns (plan, pdf bytes, Instrument)."""
+    import instrument
+    from platforms import get_highlighter
+
+    highlighter, _version = get_highlighter(platform)
+    out = io.BytesIO()
+    inst = instrument.Instrument()
+    new_plan = inst.run(highlighter, data, out, title=title, plan=plan, save_mode=save_mode,
+                        annot_mode=annot_mode, progress=inst, pages=pages)
+    return new_plan, out.getvalue(), inst
+
+def summary_job(platform, data, title, pages=None):
+    """Worker: the keeper summary of one upload (see summary.py); returns (summary, Instrument)."""
+    import instrument
+    import summary
+    from platforms import PLATFORMS
+
+    inst = instrument.Instrument()
+    result = inst.run(summary.summarize, PLATFORMS[platform], data, title=title, progress=inst,
+                      pages=pages)
+    return result, inst
+
+
+# ─────────────── Pool ─────────────────────────────────────────
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "progress", "future")
+
+    def __init__(self, fn, args, kwargs, progress):
+        self.fn, self.args, self.kwargs, self.progress = fn, args, kwargs, progress
+        self.future = Future()
+
+
+class _Slot:
+    """One worker process and the thread that feeds it jobs, replacing it as needed."""
+
+    def __init__(self, pool: "WorkerPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.proc = self.conn = None
+        self.jobs = 0             # jobs run by the current process
+        self.rss_mb = 0.0
+        self.busy_since = None
+        self.thread = threading.Thread(target=self._run, name=f"pool-worker-{index}", daemon=True)
+
+    def _spawn(self):
+        ctx = self.pool.ctx
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_worker_main, args=(child,), name=f"highlight-worker-{self.index}",
+                           daemon=True)
+        proc.start()
+        child.close()
+        try:
+            ready = parent.poll(READY_TIMEOUT)
+            if ready:
+                _ready, pid, self.rss_mb = parent.recv()
+        except EOFError:
+            proc.join(1)
+            parent.close()
+            raise RuntimeError(f"worker {self.index} exited during start-up (exit code {proc.exitcode})")
+        if not ready:
+            proc.kill()
+            parent.close()
+            raise RuntimeError(f"worker {self.index} did not start within {READY_TIMEOUT}s")
+        self.proc, self.conn, self.jobs = proc, parent, 0
+        log.info(f"Worker {self.index} ready (pid {pid}, {self.rss_mb:.0f} MB)")
+
+    def _retire(self, kill: bool = False):
+        if self.proc is None:
+            return
+        if kill:
+            self.proc.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.proc.join(5)
+            if self.proc.is_alive():
+                self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+        self.proc = self.conn = None
+
+    def _run(self):
+        pool = self.pool
+        while True:
+            if self.proc is None and not pool.closed:
+                try:
+                    self._spawn()
+                except Exception as e:
+                    log.error(f"Could not start worker {self.index}: {e}")
+                    time.sleep(1)
+                    continue
+            job = pool._queue.get()
+            if job is None:
+                break
+            pool._picked()
+            if job.future.set_running_or_notify_cancel():
+                self._execute(job)
+            pool._finished()
+        self._retire()
+
+    def _execute(self, job: _Job):
+        pool = self.pool
+        self.busy_since = time.monotonic()
+        deadline = self.busy_since + pool.timeout if pool.timeout else None
+        try:
+            self.conn.send((job.fn, job.args, job.kwargs, job.progress is not None))
+            while True:
+                wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self.conn.poll(wait):
+                    pool._count("timeouts")
+                    log.warning(f"Worker {self.index} timed out after {pool.timeout:g}s; killing it")
+                    self._retire(kill=True)
+                    job.future.set_exception(JobTimeout(f"job exceeded {pool.timeout:g}s"))
+                    return
+                msg = self.conn.recv()
+                if msg[0] == "progress":
+                    try:
+                        job.progress(msg[1], msg[2])
+                    except Exception as e:
+                        log.warning(f"Progress callback failed: {e}")
+                    continue
+                kind, value, self.rss_mb = msg
+                if kind == "done":
+                    pool._count("completed")
+                    job.future.set_result(value)
+                else:
+                    pool._count("failed")
+                    job.future.set_exception(value)
+                break
+        except (EOFError, OSError) as e:
+            pool._count("crashed")
+            log.error(f"Worker {self.index} died during a job: {e}")
+            self._retire(kill=True)
+            job.future.set_exception(WorkerCrashed(f"worker exited unexpectedly ({e})"))
+            return
+        except Exception as e:
+            # the job itself could not be sent (e.g. unpicklable arguments)
+            pool._count("failed")
+            job.future.set_exception(e)
+            return
+        finally:
+            self.busy_since = None
+
+        self.jobs += 1
+        if (pool.max_jobs and self.jobs >= pool.max_jobs) or (pool.max_rss_mb and self.rss_mb > pool.max_rss_mb):
+            log.info(f"Recycling worker {self.index} after {self.jobs} jobs at {self.rss_mb:.0f} MB")
+            pool._count("recycled")
+            self._retire()
+
+
+class WorkerPool:
+    def __init__(self, workers: int = POOL_WORKERS, max_queue: int = POOL_QUEUE,
+                 timeout: float = POOL_TIMEOUT, max_jobs: int = POOL_MAX_JOBS,
+                 max_rss_mb: float = POOL_MAX_RSS_MB):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.closed = False
+        # spawn, not fork: the API process has threads, and workers import what they need
+        self.ctx = multiprocessing.get_context("spawn")
+        self.stats_counts = {"completed": 0, "failed": 0, "timeouts": 0, "crashed": 0, "recycled": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0         # submitted, not yet picked up by a worker
+        self._running = 0
+        self._slots = [_Slot(self, i) for i in range(self.workers)]
+        for slot in self._slots:
+            slot.thread.start()
+
+    def submit(self, fn, *args, progress=None, **kwargs) -> Future:
+        """Run `fn(*args, **kwargs)` on a warm worker; returns a concurrent.futures.Future."""
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("worker pool is shut down")
+            if self._waiting + self._running >= self.workers + self.max_queue:
+                raise PoolFull(f"{self.workers} workers busy and {self._waiting} jobs queued")
+            self._waiting += 1
+        job = _Job(fn, args, kwargs, progress)
+        self._queue.put(job)
+        return job.future
+
+    def _count(self, event: str):
+        with self._lock:
+            self.stats_counts[event] += 1
+
+    def _picked(self):
+        with self._lock:
+            self._waiting -= 1
+            self._running += 1
+
+    def _finished(self):
+        with self._lock:
+            self._running -= 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            waiting, running = self._waiting, self._running
+            counts = dict(self.stats_counts)
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for s in self._slots if s.proc is not None and s.proc.is_alive()),
+            "busy": running,
+            "idle": self.workers - running,
+            "utilization": round(running / self.workers, 2),
+            "queued": waiting,
+            "max_queue": self.max_queue,
+            "timeout_s": self.timeout,
+            "max_jobs": self.max_jobs,
+            "max_rss_mb": self.max_rss_mb,
+            **counts,
+            "processes": [
+                {
+                    "pid": s.proc.pid if s.proc is not None else None,
+                    "jobs": s.jobs,
+                    "rss_mb": round(s.rss_mb, 1),
+                    "busy_s": round(now - s.busy_since, 1) if s.busy_since else None,
+                }
+                for s in self._slots
+            ],
+        }
+
+    def shutdown(self):
+        with self._lock:
+            self.closed = True
+        # fail whatever is still queued, then stop each slot after its current job
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.future.cancel()
+                self._picked()
+                self._finished()
+        for _ in self._slots:
+            self._queue.put(None)
+        for slot in self._slots:
+            slot.thread.join(timeout=10)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> WorkerPool:
+    """The process-wide warm pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+def pool_stats() -> dict | None:
+    """`stats()` of the pool if it has been started, else None."""
+    with _pool_lock:
+        return _pool.stats() if _pool is not None else None
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+annotations.py
+
+Annotation-writing benchmark: the per-rectangle `annot.update()` path the
+highlighters used before annotate.py, against the batched writer in its
+"rect" and "keeper" modes, on the same planned marks.
+
+For each synthetic invoice the marks are planned once, then every mode
+paints them onto a fresh copy of the document and saves it:
+
+  legacy  – add_highlight_annot + set_colors + update() per rectangle
+  rect    – annotate.write_marks(mode="rect")
+  keeper  – annotate.write_marks(mode="keeper")
+
+and reports annotation time, save time, annotation count and output bytes.
+
+Usage:
+    python benchmarks/annotations.py [--platforms t360,counsellink] [--pages 10,100]
+                                     [--keepers 6] [--density 0.4] [--save-mode compact]
+                                     [--out results.json]
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+API_DIR = BENCH_DIR.parent / "api"
+CORPUS_DIR = BENCH_DIR / ".corpus"
+
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from synth import InvoiceSpec, cached  # noqa: E402
+
+MODES = ("legacy", "rect", "keeper")
+
+
+def _plan(doc, platform):
+    """(marks, opacity) for `doc`, as the highlighter would paint them."""
+    import layout
+    from profiles import PROFILES
+
+    profile = next(p for name, p in PROFILES.items() if name.lower() == platform)
+    marks, _ = layout.plan_highlights(profile, doc)
+    return marks, profile.opacity
+
+
+def _legacy(doc, marks, opacity) -> int:
+    """One annotation and one appearance update per rectangle."""
+    import fitz
+
+    for pno, rect, colour in marks:
+        page = doc[pno]                 # an annot is unusable once its page is collected
+        annot = page.add_highlight_annot(fitz.Rect(rect))
+        annot.set_colors(stroke=colour)
+        if opacity is not None:
+            annot.set_opacity(opacity)
+        annot.update()
+    return len(marks)
+
+
+def run_case(spec: InvoiceSpec, save_mode: str) -> list[dict]:
+    from annotate import write_marks
+    from extract import open_document
+    from output import SAVE_MODES
+
+    data = cached(spec, CORPUS_DIR).read_bytes()
+    doc = open_document(data)
+    marks, opacity = _plan(doc, spec.platform)
+    doc.close()
+
+    results = []
+    for mode in MODES:
+        doc = open_document(data)
+        t0 = time.perf_counter()
+        if mode == "legacy":
+            count = _legacy(doc, marks, opacity)
+        else:
+            count = write_marks(doc, marks, opacity=opacity, mode=mode)
+        t1 = time.perf_counter()
+        out = io.BytesIO()
+        doc.save(out, **SAVE_MODES[save_mode])
+        t2 = time.perf_counter()
+        doc.close()
+        results.append({
+            "case": spec.slug,
+            "mode": mode,
+            "marks": len(marks),
+            "annotations": count,
+            "annotate_s": round(t1 - t0, 4),
+            "save_s": round(t2 - t1, 4),
+            "output_bytes": out.tell(),
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compare annotation writers on synthetic invoices.")
+    ap.add_argument("--platforms", default="t360,counsellink")
+    ap.add_argument("--pages", default="10,100", help="comma-separated page counts")
+    ap.add_argument("--keepers", type=int, default=6)
+    ap.add_argument("--density", type=float, default=0.4)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save-mode", default="compact")
+    ap.add_argument("--out", type=Path, help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    results = []
+    for platform in args.platforms.split(","):
+        for pages in args.pages.split(","):
+            spec = InvoiceSpec(platform, int(pages), args.keepers, args.density, args.seed)
+            case = run_case(spec, args.save_mode)
+            legacy = case[0]
+            for r in case:
+                speedup = legacy["annotate_s"] / r["annotate_s"] if r["annotate_s"] else float("inf")
+                print(f"{r['case']:<36} {r['mode']:<7} {r['annotate_s']:8.3f}s annotate "
+                      f"({speedup:5.1f}x) {r['save_s']:7.3f}s save {r['annotations']:7d} annots "
+                      f"{r['output_bytes'] / 1024:9.1f} KB")
+            results.extend(case)
+
+    if args.out:
+        args.out.write_text(json.dumps({"save_mode": args.save_mode, "results": results}, indent=2))
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+bench.py
+
+Stage-by-stage benchmark of the platform profiles on synthetic invoices
+(see synth.py), with throughput, peak RSS and baseline comparison.
+
+Each case runs in a fresh process, so its peak RSS is its own. The stages
+mirror the production pipeline (layout.py):
+
+  extraction  – word dicts for every page (extract.open_engine)
+  grouping    – layout.group_rows with the profile's row layout
+  parsing     – layout.plan_marks (the profile's state machine + keeper colours)
+  annotation  – layout.paint_marks
+  retitle     – set /Title and drop XMP (profiles that retitle, e.g. T360)
+  save        – doc.save with the chosen save mode, to memory
+
+Usage:
+    python benchmarks/bench.py [--platforms t360,counsellink] [--pages 10,100]
+                               [--keepers 6] [--density 0.4] [--engine pymupdf]
+                               [--save-mode compact] [--annot-mode rect] [--out results.json]
+                               [--baseline baseline.json --tolerance 1.25]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import platform as host
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+API_DIR = BENCH_DIR.parent / "api"
+CORPUS_DIR = BENCH_DIR / ".corpus"
+
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from synth import InvoiceSpec, cached  # noqa: E402
+
+
+class Stages:
+    """Collects wall-clock seconds per named stage."""
+
+    def __init__(self):
+        self.seconds = {}
+        self._t = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.seconds[name] = round(now - self._t, 4)
+        self._t = now
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_profile(doc, spec, engine, save_mode, annot_mode, stages, counts):
+    import layout
+    from extract import open_engine
+    from output import SAVE_MODES, set_title
+    from profiles import PROFILES
+
+    profile = next(p for name, p in PROFILES.items() if name.lower() == spec.platform)
+    with open_engine(doc, engine, **profile.extract) as page_words:
+        words = [page_words(pno) for pno in range(doc.page_count)]
+    stages.lap("extraction")
+    group = layout.row_builder(profile)
+    rows = [group(w) for w in words]
+    stages.lap("grouping")
+    marks, colours = layout.plan_marks(profile, rows, progress=lambda k, n: counts.__setitem__(k, n))
+    stages.lap("parsing")
+    counts["annotations"] = layout.paint_marks(profile, doc, marks, annot_mode=annot_mode)
+    stages.lap("annotation")
+    if profile.retitle:
+        set_title(doc, spec.slug)
+        stages.lap("retitle")
+    out = io.BytesIO()
+    doc.save(out, **SAVE_MODES[save_mode])
+    stages.lap("save")
+    counts.update(words=sum(map(len, words)), rows=sum(map(len, rows)),
+                  keepers=len(colours), output_bytes=out.tell())
+
+
+def run_case(spec: InvoiceSpec, engine: str, save_mode: str, annot_mode: str = "rect") -> dict:
+    """Benchmark one invoice; meant to run in its own process."""
+    from extract import open_document
+
+    data = cached(spec, CORPUS_DIR).read_bytes()
+    stages, counts = Stages(), {}
+    doc = open_document(data)
+    stages.lap("open")
+    _run_profile(doc, spec, engine, save_mode, annot_mode, stages, counts)
+    doc.close()
+    total = sum(stages.seconds.values())
+    return {
+        "case": spec.slug,
+        "spec": asdict(spec),
+        "engine": engine,
+        "save_mode": save_mode,
+        "annot_mode": annot_mode,
+        "stages": stages.seconds,
+        "total_s": round(total, 4),
+        "pages_per_s": round(spec.pages / total, 2) if total else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "counts": counts,
+    }
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Print per-case ratios against `baseline`; return regression messages."""
+    old = {(r["case"], r["engine"], r["save_mode"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        b = old.get((r["case"], r["engine"], r["save_mode"]))
+        if b is None:
+            print(f"  {r['case']}: no baseline")
+            continue
+        ratio = r["total_s"] / b["total_s"] if b["total_s"] else float("inf")
+        stage_ratios = ", ".join(
+            f"{name} {r['stages'][name] / b['stages'][name]:.2f}x"
+            for name in r["stages"] if b["stages"].get(name)
+        )
+        print(f"  {r['case']}: {ratio:.2f}x baseline total ({stage_ratios})")
+        if ratio > tolerance:
+            regressions.append(f"{r['case']} is {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the highlighters on synthetic invoices.")
+    ap.add_argument("--platforms", default="t360,counsellink")
+    ap.add_argument("--pages", default="10,100", help="comma-separated page counts (10–2000)")
+    ap.add_argument("--keepers", default="6", help="comma-separated keeper counts")
+    ap.add_argument("--density", default="0.4", help="comma-separated A&C / CRL densities")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--engine", default="pymupdf")
+    ap.add_argument("--save-mode", default="compact")
+    ap.add_argument("--annot-mode", default="rect", help="rect or keeper (see api/annotate.py)")
+    ap.add_argument("--out", type=Path, help="write results JSON here")
+    ap.add_argument("--baseline", type=Path, help="results JSON from an earlier run to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="max allowed slowdown vs baseline")
+    args = ap.parse_args(argv)
+
+    specs = [
+        InvoiceSpec(p, int(pages), int(keepers), float(density), args.seed)
+        for p in args.platforms.split(",")
+        for pages in args.pages.split(",")
+        for keepers in args.keepers.split(",")
+        for density in args.density.split(",")
+    ]
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for spec in specs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            r = pool.submit(run_case, spec, args.engine, args.save_mode, args.annot_mode).result()
+        results.append(r)
+        stages = "  ".join(f"{k} {v:.3f}s" for k, v in r["stages"].items())
+        print(f"{r['case']:<36} {r['total_s']:8.3f}s {r['pages_per_s']:8.1f} p/s "
+              f"{r['peak_rss_mb']:7.1f} MB   {stages}")
+
+    report = {
+        "python": sys.version.split()[0],
+        "machine": host.machine(),
+        "cpus": multiprocessing.cpu_count(),
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.out}")
+    if args.baseline:
+        print(f"Compared with {args.baseline}:")
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for msg in regressions:
+            print(f"REGRESSION: {msg}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
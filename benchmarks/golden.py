@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+golden.py
+
+Golden-output regression harness: runs every platform highlighter over a
+fixed corpus of synthetic invoices (see synth.py) and compares the
+highlights in each output PDF with the golden JSON in
+benchmarks/golden/<engine>/. Any added, missing or moved highlight, or a
+changed colour, fails the run. Each extraction engine (see api/extract.py)
+has its own goldens, since their word boxes differ slightly.
+
+Each corpus case also carries time and memory budgets: per-stage
+milliseconds (the Server-Timing stages of instrument.py, plus "total") and
+peak RSS. A case over budget fails the same run, so correctness and speed
+regressions surface together. Budgets are for the default PyMuPDF engine;
+other engines are checked against their goldens only. Cases run one per
+fresh process, so each peak RSS is the case's own, with a fresh in-memory
+keeper colour registry.
+
+A golden records, per annotation, [page index, x0, y0, x1, y1, "RRGGBB"]
+(rounded to 0.01 pt, sorted), as read back from the saved PDF. Goldens are
+written with --update after an intended change to what gets highlighted;
+review the diff like any other code change.
+
+Usage:
+    python benchmarks/golden.py [--cases t360,counsellink-p30] [--engine pdfplumber]
+                                [--budget-scale 2] [--skip-budgets]
+    python benchmarks/golden.py --update [--engine pdfplumber]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+API_DIR = BENCH_DIR.parent / "api"
+CORPUS_DIR = BENCH_DIR / ".corpus"
+GOLDEN_DIR = BENCH_DIR / "golden"
+
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from synth import InvoiceSpec, cached  # noqa: E402
+
+# every case starts from an empty keeper registry (see api/keepers.py), so its
+# colours depend on the case alone, not on what this machine highlighted before
+os.environ["HIGHLIGHT_KEEPER_DB"] = ":memory:"
+
+MAX_DIFFS = 10      # differing annotations printed per case
+BUDGET_ENGINE = "pymupdf"
+
+
+@dataclass
+class Case:
+    spec: InvoiceSpec
+    budgets: dict = field(default_factory=dict)   # stage → ms, "total" → ms, "peak_rss_mb" → MB
+
+    @property
+    def name(self) -> str:
+        return self.spec.slug
+
+
+# Budgets are a few times the timings measured (on one CPU) when the goldens
+# were recorded, so only real regressions trip them; scale them with
+# --budget-scale on slower machines.
+CORPUS = [
+    Case(InvoiceSpec("t360", 12),
+         {"extract": 250, "parse": 150, "annotate": 600, "save": 800, "total": 1500, "peak_rss_mb": 150}),
+    Case(InvoiceSpec("t360", 40, keepers=12, density=0.8, seed=2),
+         {"extract": 800, "parse": 400, "annotate": 2000, "save": 2500, "total": 5000, "peak_rss_mb": 150}),
+    Case(InvoiceSpec("counsellink", 12),
+         {"locate": 100, "extract": 250, "parse": 150, "annotate": 2500, "save": 4000, "total": 6000,
+          "peak_rss_mb": 150}),
+    Case(InvoiceSpec("counsellink", 30, keepers=10, density=0.7, seed=2),
+         {"locate": 200, "extract": 600, "parse": 400, "annotate": 6000, "save": 10000, "total": 15000,
+          "peak_rss_mb": 150}),
+]
+
+
+def _order(a):
+    return a[0], a[2], a[1], a[3], a[4], a[5] or ""
+
+
+def annotations(pdf: bytes) -> list[list]:
+    """[page, x0, y0, x1, y1, colour] for every annotation in `pdf`, sorted."""
+    from extract import open_document
+    from profiles import rgb2hex
+
+    found = []
+    with open_document(pdf) as doc:
+        for page in doc:
+            for annot in page.annots():
+                colour = annot.colors.get("stroke") or annot.colors.get("fill") or ()
+                found.append([page.number, *(round(v, 2) for v in annot.rect),
+                              rgb2hex(colour) if len(colour) == 3 else None])
+    return sorted(found, key=_order)
+
+
+def run_case(case: Case, engine: str | None, save_mode: str) -> dict:
+    """Highlight one corpus invoice as the API does; meant to run in its own process."""
+    import instrument
+    from platforms import PLATFORMS, get_highlighter
+
+    platform = next(name for name in PLATFORMS if name.lower() == case.spec.platform)
+    highlighter, version = get_highlighter(platform)
+    data = cached(case.spec, CORPUS_DIR).read_bytes()
+    out = io.BytesIO()
+    inst = instrument.Instrument()
+    inst.run(highlighter, data, out, title=case.name, engine=engine, save_mode=save_mode,
+             annot_mode="rect", progress=inst)
+    return {"case": case.name, "platform": platform, "version": version,
+            "annotations": annotations(out.getvalue()), "timings": inst.as_dict()}
+
+
+def write_golden(path: Path, result: dict):
+    # one annotation per line keeps golden diffs readable in review
+    rows = ",\n".join("    " + json.dumps(a) for a in result["annotations"])
+    header = {k: result[k] for k in ("case", "platform", "version")}
+    path.write_text(json.dumps(header, indent=2)[:-2] + ',\n  "annotations": [\n' + rows + "\n  ]\n}\n")
+
+
+def diff(golden: list[list], actual: list[list]) -> list[str]:
+    """Human-readable differences between two annotation lists, in page order."""
+    want, got = set(map(tuple, golden)), set(map(tuple, actual))
+    changes = [("missing", a) for a in want - got] + [("extra  ", a) for a in got - want]
+    lines = [f"{what} {json.dumps(list(a))}" for what, a in sorted(changes, key=lambda c: _order(c[1]))]
+    if not lines and len(golden) != len(actual):
+        lines.append(f"{len(actual)} annotations, golden has {len(golden)} (duplicates differ)")
+    return lines
+
+
+def over_budget(case: Case, timings: dict, scale: float) -> list[str]:
+    stages = {**timings["stages_ms"], "total": timings["total_ms"]}
+    msgs = []
+    for name, budget in case.budgets.items():
+        if name == "peak_rss_mb":
+            actual, limit, unit = timings["counts"]["peak_rss_mb"], budget, "MB"
+        else:
+            actual, limit, unit = stages.get(name, 0.0), budget * scale, "ms"
+        if actual > limit:
+            msgs.append(f"{name} {actual:.1f} {unit} > budget {limit:.1f} {unit}")
+    return msgs
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Check the highlighters against golden outputs and budgets.")
+    ap.add_argument("--cases", help="comma-separated prefixes of case names to run (default: all)")
+    ap.add_argument("--engine", default=BUDGET_ENGINE, help="extraction engine (see api/extract.py)")
+    ap.add_argument("--save-mode", default="compact")
+    ap.add_argument("--update", action="store_true", help="rewrite the goldens from this run")
+    ap.add_argument("--budget-scale", type=float, default=1.0, help="multiply every time budget")
+    ap.add_argument("--skip-budgets", action="store_true")
+    args = ap.parse_args(argv)
+
+    cases = [c for c in CORPUS
+             if not args.cases or any(c.name.startswith(p) for p in args.cases.split(","))]
+    if not cases:
+        ap.error(f"no corpus case matches {args.cases!r}")
+    golden_dir = GOLDEN_DIR / args.engine
+    golden_dir.mkdir(parents=True, exist_ok=True)
+    check_budgets = not args.skip_budgets and args.engine == BUDGET_ENGINE
+
+    failures = []
+    ctx = multiprocessing.get_context("spawn")
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            r = pool.submit(run_case, case, args.engine, args.save_mode).result()
+        t = r["timings"]
+        stages = "  ".join(f"{k} {v:.0f}" for k, v in t["stages_ms"].items())
+        print(f"{case.name:<36} {len(r['annotations']):6d} annots {t['total_ms']:8.0f} ms "
+              f"{t['counts']['peak_rss_mb']:6.1f} MB   {stages}")
+
+        path = golden_dir / f"{case.name}.json"
+        if args.update:
+            write_golden(path, r)
+            print(f"  wrote {path.relative_to(BENCH_DIR.parent)}")
+        elif not path.exists():
+            failures.append(f"{case.name}: no golden; run with --update")
+        else:
+            golden = json.loads(path.read_text())
+            if golden["version"] != r["version"]:
+                print(f"  note: golden is from {r['platform']} version {golden['version']}, now {r['version']}")
+            lines = diff(golden["annotations"], r["annotations"])
+            for line in lines[:MAX_DIFFS]:
+                print(f"  {line}")
+            if len(lines) > MAX_DIFFS:
+                print(f"  … {len(lines) - MAX_DIFFS} more")
+            if lines:
+                failures.append(f"{case.name}: output differs from golden ({len(lines)} annotations)")
+
+        if check_budgets:
+            failures.extend(f"{case.name}: {msg}" for msg in over_budget(case, t, args.budget_scale))
+
+    for msg in failures:
+        print(f"FAILED: {msg}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+import_time.py
+
+Cold-start budget check for the Vercel Python function.
+
+Runs `python -X importtime -c "import highlight"` in a fresh interpreter
+(best of --runs), then fails if
+  • any heavy PDF/numeric library is imported at module import time, or
+  • the total import time or the self-time of our own api/ modules is over budget.
+
+The lazy per-platform imports are measured too, for information.
+
+Usage:
+    python benchmarks/import_time.py [--total-ms 1500] [--local-ms 60] [--runs 5]
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent / "api"
+# must only be imported once a request needs them
+HEAVY = ("fitz", "pymupdf", "pdfplumber", "pdfminer", "numpy", "pypdf")
+LAZY = ("layout", "fitz")    # the engine, and PyMuPDF on first use of any platform
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(module: str) -> dict[str, tuple[int, int]]:
+    """Return {module: (self_us, cumulative_us)} for one cold import of `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            times[m[4]] = (int(m[1]), int(m[2]))
+    return times
+
+
+def best_of(module: str, runs: int) -> dict[str, tuple[int, int]]:
+    return min((importtime(module) for _ in range(runs)), key=lambda t: t[module][1])
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    ap.add_argument("--module", default="highlight")
+    ap.add_argument("--total-ms", type=float, default=1500, help="budget for the whole import")
+    ap.add_argument("--local-ms", type=float, default=60, help="budget for api/ modules' own code")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    local = {p.stem for p in API_DIR.glob("*.py")}
+    times = best_of(args.module, args.runs)
+    total_ms = times[args.module][1] / 1000
+    local_ms = sum(self_us for name, (self_us, _) in times.items() if name in local) / 1000
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY)
+    lazy = {name: best_of(name, args.runs)[name][1] / 1000 for name in LAZY}
+
+    report = {
+        "module": args.module,
+        "total_ms": round(total_ms, 1),
+        "local_ms": round(local_ms, 1),
+        "heavy_imports": heavy,
+        "slowest": [
+            {"module": name, "cumulative_ms": round(cum / 1000, 1)}
+            for name, (_, cum) in sorted(times.items(), key=lambda kv: -kv[1][1])[1:11]
+        ],
+        "lazy_ms": {name: round(ms, 1) for name, ms in lazy.items()},
+    }
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported eagerly: {', '.join(heavy[:5])}")
+    if total_ms > args.total_ms:
+        failures.append(f"total import {total_ms:.1f} ms > {args.total_ms} ms")
+    if local_ms > args.local_ms:
+        failures.append(f"api/ modules {local_ms:.1f} ms > {args.local_ms} ms")
+    report["failures"] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: {report['total_ms']} ms total, {report['local_ms']} ms in api/ modules")
+        for entry in report["slowest"]:
+            print(f"  {entry['cumulative_ms']:>8} ms  {entry['module']}")
+        for name, ms in report["lazy_ms"].items():
+            print(f"  first use of {name}: {ms} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
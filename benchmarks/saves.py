@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+saves.py
+
+Save-mode benchmark: the full rewrites ("compact", "fast") against the
+incremental update ("incremental") on the same highlighted document.
+
+For each synthetic invoice the marks are planned once, then every mode
+paints them onto a fresh copy of the document, sets the title and saves it
+through output.save_document. Each output is reopened and checked: it must
+not need repair and must hold every annotation and the new title; an
+incremental output must also begin with the original bytes unchanged.
+
+Reports save time, output bytes and how much the output grew over the input.
+
+Usage:
+    python benchmarks/saves.py [--platforms t360,counsellink] [--pages 100,500]
+                               [--keepers 6] [--density 0.4] [--out results.json]
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+API_DIR = BENCH_DIR.parent / "api"
+CORPUS_DIR = BENCH_DIR / ".corpus"
+
+sys.path.insert(0, str(API_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+from synth import InvoiceSpec, cached  # noqa: E402
+
+MODES = ("compact", "fast", "incremental")
+TITLE = "Benchmark title"
+
+
+def _check(data: bytes, output: bytes, annotations: int, mode: str) -> str | None:
+    """Why `output` is not a sound result of saving in `mode`, or None."""
+    from extract import open_document
+
+    if mode == "incremental" and not output.startswith(data):
+        return "original bytes not preserved"
+    with open_document(output) as doc:
+        if doc.is_repaired:
+            return "output needed repair"
+        found = sum(1 for page in doc for _ in page.annots())
+        if found != annotations:
+            return f"{found} annotations, expected {annotations}"
+        if doc.metadata.get("title") != TITLE:
+            return "title not set"
+    return None
+
+
+def run_case(spec: InvoiceSpec) -> list[dict]:
+    import layout
+    from annotate import write_marks
+    from extract import open_document
+    from output import save_document
+    from profiles import PROFILES
+
+    profile = next(p for name, p in PROFILES.items() if name.lower() == spec.platform)
+    data = cached(spec, CORPUS_DIR).read_bytes()
+    with open_document(data) as doc:
+        marks, _ = layout.plan_highlights(profile, doc)
+
+    results = []
+    for mode in MODES:
+        with open_document(data) as doc:
+            count = write_marks(doc, marks, opacity=profile.opacity)
+            out = io.BytesIO()
+            t0 = time.perf_counter()
+            save_document(doc, out, title=TITLE, save_mode=mode)
+            elapsed = time.perf_counter() - t0
+        output = out.getvalue()
+        results.append({
+            "case": spec.slug,
+            "mode": mode,
+            "annotations": count,
+            "save_s": round(elapsed, 4),
+            "input_bytes": len(data),
+            "output_bytes": len(output),
+            "growth_bytes": len(output) - len(data),
+            "error": _check(data, output, count, mode),
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compare full-rewrite and incremental saves on synthetic invoices.")
+    ap.add_argument("--platforms", default="t360,counsellink")
+    ap.add_argument("--pages", default="100,500", help="comma-separated page counts")
+    ap.add_argument("--keepers", type=int, default=6)
+    ap.add_argument("--density", type=float, default=0.4)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    results, failed = [], False
+    for platform in args.platforms.split(","):
+        for pages in args.pages.split(","):
+            spec = InvoiceSpec(platform, int(pages), args.keepers, args.density, args.seed)
+            case = run_case(spec)
+            compact = case[0]
+            for r in case:
+                speedup = compact["save_s"] / r["save_s"] if r["save_s"] else float("inf")
+                print(f"{r['case']:<36} {r['mode']:<11} {r['save_s']:8.3f}s save ({speedup:6.1f}x) "
+                      f"{r['annotations']:7d} annots {r['output_bytes'] / 1024:9.1f} KB "
+                      f"({r['growth_bytes'] / 1024:+9.1f} KB)"
+                      + (f"  FAILED: {r['error']}" if r["error"] else ""))
+                failed |= r["error"] is not None
+            results.extend(case)
+
+    if args.out:
+        args.out.write_text(json.dumps({"results": results}, indent=2))
+        print(f"Wrote {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+synth.py
+
+Synthetic T360 and CounselLink invoices for benchmarks and regression runs.
+
+The text is laid out so the real profiles (api/profiles.py) find work on
+every page:
+
+  T360        – line items matching the record pattern ("12 3/14/2024 Last, First A104 …"),
+                keeper names that wrap onto continuation rows at the same x0,
+                and "Adjustments and Credit" blocks that may run across a
+                page break.
+  CounselLink – a cover page, the "Client Adjusted Charges Summary" section
+                marker, CRL header blocks (x0 < the header's max_x0) and
+                body rows matching the record pattern ("3 03/14/2024 JDS …").
+
+Generation is deterministic for a given spec (seeded RNG), so a spec can be
+used as a cache key and golden outputs stay stable.
+
+Usage:
+    python benchmarks/synth.py t360|counsellink PAGES out.pdf [--keepers N] [--density F] [--seed S]
+"""
+import argparse
+import random
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import fitz
+
+PAGE_W, PAGE_H = 612, 792          # US Letter
+TOP, BOTTOM, LEAD = 54, 738, 11    # first baseline, last baseline, line height
+FONT_SIZE = 8
+
+FIRST = ["John", "Jane", "Alex", "Pat", "Maria", "Wei", "Omar", "Grace", "Ivan", "Lena",
+         "Noah", "Priya", "Tom", "Ana", "Kofi", "Sara"]
+LAST = ["Smith", "Doe", "Nguyen", "Brown", "Garcia", "Chen", "Haddad", "Okafor", "Petrov",
+        "Schmidt", "Cohen", "Patel", "Rossi", "Silva", "Mensah", "Larsen"]
+MIDDLE = ["Q.", "R.", "A.", "M."]
+TASKS = ["A101", "A102", "A103", "A104", "A106", "L110", "L120", "L210", "L310", "L320"]
+DESCRIPTIONS = ["Review documents", "Draft memo to client", "Telephone conference",
+                "Prepare discovery responses", "Research case law", "Revise motion"]
+AC_REASONS = ["Reduced rate per billing guideline", "Block billing not permitted",
+              "Duplicate entry", "Excessive time for task", "Non-billable administrative task"]
+
+
+@dataclass(frozen=True)
+class InvoiceSpec:
+    platform: str            # "t360" or "counsellink"
+    pages: int
+    keepers: int = 6
+    density: float = 0.4     # T360: share of line items with an A&C block; CounselLink: CRL headers per row
+    seed: int = 1
+
+    @property
+    def slug(self) -> str:
+        return f"{self.platform}-p{self.pages}-k{self.keepers}-d{self.density:g}-s{self.seed}"
+
+
+class _Writer:
+    """Flows lines top-to-bottom across pages, one TextWriter per page."""
+
+    def __init__(self, doc: fitz.Document, pages: int):
+        self.doc, self.max_pages = doc, pages
+        self.font = fitz.Font("helv")
+        self.page = self.tw = None
+        self.y = BOTTOM + 1
+
+    @property
+    def full(self) -> bool:
+        return self.doc.page_count >= self.max_pages and self.y > BOTTOM
+
+    def newline(self):
+        self.y += LEAD
+        if self.y > BOTTOM:
+            self._flush()
+            if self.doc.page_count < self.max_pages:
+                self.page = self.doc.new_page(width=PAGE_W, height=PAGE_H)
+                self.tw = fitz.TextWriter(self.page.rect)
+                self.y = TOP
+
+    def text(self, x: float, s: str):
+        if self.tw is not None:
+            self.tw.append((x, self.y), s, font=self.font, fontsize=FONT_SIZE)
+
+    def _flush(self):
+        if self.tw is not None:
+            self.tw.write_text(self.page)
+            self.tw = None
+
+    def close(self):
+        self._flush()
+
+
+def _keeper_names(rnd: random.Random, n: int):
+    names = set()
+    while len(names) < n:
+        name = [f"{rnd.choice(LAST)},", rnd.choice(FIRST)]
+        if rnd.random() < 0.3:
+            name.append(rnd.choice(MIDDLE))
+        names.add(tuple(name))
+    return sorted(names)
+
+
+def _t360(doc: fitz.Document, spec: InvoiceSpec, rnd: random.Random):
+    keepers = _keeper_names(rnd, spec.keepers)
+    w = _Writer(doc, spec.pages)
+    w.newline()
+    w.text(40, "Invoice Line Items")
+    n = 1
+    while not w.full:
+        keeper = rnd.choice(keepers)
+        w.newline()
+        w.text(30, str(n))
+        w.text(52, f"{rnd.randint(1, 12)}/{rnd.randint(1, 28)}/2024")
+        w.text(110, keeper[0])
+        w.text(200, rnd.choice(TASKS))
+        w.text(240, f"{rnd.choice(DESCRIPTIONS)} {rnd.randint(1, 40) / 10:.1f} {rnd.randint(50, 2000)}.00")
+        for part in keeper[1:]:            # name continuation rows, same x0
+            w.newline()
+            w.text(110, part)
+        if rnd.random() < spec.density:
+            w.newline()
+            w.text(240, "Adjustments and Credit")
+            for _ in range(rnd.randint(1, 4)):
+                w.newline()
+                w.text(240, f"{rnd.choice(AC_REASONS)} -{rnd.randint(10, 500)}.00")
+        n = n % 999 + 1                    # the record pattern allows up to 3 digits
+    w.close()
+
+
+def _counsellink(doc: fitz.Document, spec: InvoiceSpec, rnd: random.Random):
+    initials = sorted({"".join(rnd.choice("ABCDEFGHJKLMNPRSTW") for _ in range(rnd.randint(2, 4)))
+                       for _ in range(spec.keepers * 3)})[:spec.keepers]
+    w = _Writer(doc, spec.pages)
+    w.newline()
+    w.text(40, "CounselLink Invoice Summary")
+    if spec.pages > 1:                     # section starts on page 2, after a cover page
+        while w.doc.page_count < 2:
+            w.newline()
+    w.newline()
+    w.text(40, "Client Adjusted Charges Summary")
+    n = 1
+    while not w.full:
+        if rnd.random() < spec.density:
+            w.newline()
+            w.text(40, f"CRL{rnd.randint(100000, 999999)} Matter {rnd.randint(1000, 9999)}")
+            for _ in range(rnd.randint(0, 2)):
+                w.newline()
+                w.text(40, rnd.choice(AC_REASONS))
+            n = 1
+        w.newline()
+        w.text(30, str(n))
+        w.text(52, f"{rnd.randint(1, 12):02d}/{rnd.randint(1, 28):02d}/2024")
+        w.text(110, rnd.choice(initials))
+        w.text(160, f"{rnd.choice(DESCRIPTIONS)} {rnd.randint(1, 40) / 10:.1f} {rnd.randint(50, 2000)}.00")
+        n += 1
+    w.close()
+
+
+GENERATORS = {"t360": _t360, "counsellink": _counsellink}
+
+
+def generate(spec: InvoiceSpec) -> bytes:
+    """Return the PDF bytes for `spec`."""
+    doc = fitz.open()
+    GENERATORS[spec.platform](doc, spec, random.Random(f"{spec.slug}"))
+    doc.set_metadata({"title": spec.slug, "creator": "legal-eagle synth"})
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+def cached(spec: InvoiceSpec, cache_dir: Path) -> Path:
+    """Path to the generated invoice for `spec`, generating it on first use."""
+    path = Path(cache_dir) / f"{spec.slug}.pdf"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".part")
+        tmp.write_bytes(generate(spec))
+        tmp.replace(path)
+    return path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate a synthetic invoice PDF.")
+    ap.add_argument("platform", choices=GENERATORS)
+    ap.add_argument("pages", type=int)
+    ap.add_argument("out", type=Path)
+    ap.add_argument("--keepers", type=int, default=InvoiceSpec.keepers)
+    ap.add_argument("--density", type=float, default=InvoiceSpec.density)
+    ap.add_argument("--seed", type=int, default=InvoiceSpec.seed)
+    args = ap.parse_args(argv)
+    spec = InvoiceSpec(args.platform, args.pages, args.keepers, args.density, args.seed)
+    args.out.write_bytes(generate(spec))
+    print(f"Wrote {args.out} ({asdict(spec)})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
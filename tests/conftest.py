@@ -0,0 +1,27 @@
+"""
+Shared test set-up: puts api/ and benchmarks/ on the import path the way the
+API and the benchmark scripts run, and keeps keeper colours (keepers.py)
+and caches (cache.py) out of the developer's real cache directory.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "benchmarks"
+
+os.environ["HIGHLIGHT_KEEPER_DB"] = ":memory:"
+os.environ.setdefault("HIGHLIGHT_CACHE_DIR", tempfile.mkdtemp(prefix="legal-eagle-test-"))
+sys.path.insert(0, str(ROOT / "api"))
+sys.path.insert(0, str(BENCH_DIR))
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """`corpus(platform, pages)` → path of a synthetic invoice (see benchmarks/synth.py)."""
+    from synth import InvoiceSpec, cached
+
+    return lambda platform, pages: cached(InvoiceSpec(platform, pages), BENCH_DIR / ".corpus")
@@ -0,0 +1,38 @@
+"""
+Extraction-engine parity: planning an invoice with the PyMuPDF engine must
+give the same highlights as the original pdfplumber one.
+
+Keepers, pages and colours must match mark for mark. Rectangles are compared
+within a tolerance: left and right edges agree (X_TOLERANCE); both engines
+make word boxes the font size tall, but place them slightly differently,
+so tops and bottoms differ by up to about 0.65 pt (Y_TOLERANCE).
+"""
+import pytest
+
+import layout
+from extract import open_document
+from profiles import PROFILES
+
+X_TOLERANCE = 0.01   # pt
+Y_TOLERANCE = 1.0    # pt
+
+
+def plan(path, platform, engine):
+    profile = next(p for name, p in PROFILES.items() if name.lower() == platform)
+    with open_document(path) as doc:
+        marks, _ = layout.plan_highlights(profile, doc, engine=engine)
+    return marks
+
+
+@pytest.mark.parametrize("platform", ["t360", "counsellink"])
+def test_engines_plan_same_marks(corpus, platform):
+    path = corpus(platform, 12)
+    fitz_marks = plan(path, platform, "pymupdf")
+    plumber_marks = plan(path, platform, "pdfplumber")
+
+    assert fitz_marks
+    assert [(pno, colour) for pno, _, colour in fitz_marks] == \
+           [(pno, colour) for pno, _, colour in plumber_marks]
+    for (_, a, _), (_, b, _) in zip(fitz_marks, plumber_marks):
+        assert a[0] == pytest.approx(b[0], abs=X_TOLERANCE) and a[2] == pytest.approx(b[2], abs=X_TOLERANCE)
+        assert a[1] == pytest.approx(b[1], abs=Y_TOLERANCE) and a[3] == pytest.approx(b[3], abs=Y_TOLERANCE)
@@ -0,0 +1,52 @@
+"""
+Retitling on save: in every save mode the output carries the new /Title and
+no XMP /Metadata stream (viewers would show the XMP title over it).
+"""
+import io
+
+import fitz
+import pytest
+
+from extract import open_document
+from output import SAVE_MODES, save_document
+
+XMP = """<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/">
+   <dc:title><rdf:Alt><rdf:li xml:lang="x-default">XMP title</rdf:li></rdf:Alt></dc:title>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>"""
+
+
+@pytest.fixture
+def pdf_with_xmp() -> bytes:
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"Page {n + 1}")
+    doc.set_metadata({"title": "Old title"})
+    doc.set_xml_metadata(XMP)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.parametrize("save_mode", list(SAVE_MODES))
+def test_save_sets_title_and_strips_xmp(pdf_with_xmp, save_mode):
+    with open_document(pdf_with_xmp) as doc:
+        assert "XMP title" in doc.get_xml_metadata()
+        doc[0].add_highlight_annot(fitz.Rect(70, 60, 140, 76))
+        out = io.BytesIO()
+        save_document(doc, out, title="New title", save_mode=save_mode)
+
+    data = out.getvalue()
+    if save_mode == "incremental":
+        assert data.startswith(pdf_with_xmp)
+    with open_document(data) as saved:
+        assert not saved.is_repaired
+        assert saved.metadata["title"] == "New title"
+        assert saved.get_xml_metadata() == ""
+        assert saved.xref_get_key(saved.pdf_catalog(), "Metadata") == ("null", "null")
+        assert len(list(saved[0].annots())) == 1